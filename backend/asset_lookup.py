@@ -0,0 +1,65 @@
+from typing import Dict, Iterable, NamedTuple, Optional
+from sqlalchemy.orm import Session
+import models
+
+
+class AssetRef(NamedTuple):
+    id: int
+    team_id: int
+
+
+class AssetLookup:
+    """
+    In-memory ip_address -> (asset id, team_id) map for matching bulk incoming
+    records (InsightVM sync, CSV upload) against local assets without a query per record.
+    Assets created during the run must be registered with add() to keep the map correct.
+    """
+
+    def __init__(self, refs: Optional[Dict[str, AssetRef]] = None):
+        self._by_ip = refs or {}
+
+    @classmethod
+    def load(cls, db: Session, ip_addresses: Optional[Iterable[str]] = None, chunk_size: int = 50000) -> "AssetLookup":
+        """
+        Load the map in chunks of `chunk_size` rows (keyset paginated on id), optionally
+        limited to the given IP addresses.
+        """
+        ip_filter = list(set(ip_addresses)) if ip_addresses is not None else None
+        refs = {}
+        last_id = 0
+        while True:
+            query = db.query(models.Asset.id, models.Asset.ip_address, models.Asset.team_id).filter(
+                models.Asset.id > last_id
+            )
+            if ip_filter is not None:
+                query = query.filter(models.Asset.ip_address.in_(ip_filter))
+            rows = query.order_by(models.Asset.id).limit(chunk_size).all()
+            for asset_id, ip_address, team_id in rows:
+                # Keep the oldest asset when an IP is duplicated, matching .first() by id
+                refs.setdefault(ip_address, AssetRef(asset_id, team_id))
+            if len(rows) < chunk_size:
+                break
+            last_id = rows[-1][0]
+        return cls(refs)
+
+    def get(self, ip_address: str) -> Optional[AssetRef]:
+        return self._by_ip.get(ip_address)
+
+    def add(self, ip_address: str, asset_id: int, team_id: int):
+        """Register an asset created during the run, once its insert is committed"""
+        self._by_ip.setdefault(ip_address, AssetRef(asset_id, team_id))
+
+    def refresh(self, db: Session, ip_address: str) -> Optional[AssetRef]:
+        """Look up an IP the map does not know in the database, e.g. one another process just created"""
+        row = db.query(models.Asset.id, models.Asset.team_id).filter(
+            models.Asset.ip_address == ip_address
+        ).order_by(models.Asset.id).first()
+        if row is not None:
+            self.add(ip_address, row[0], row[1])
+        return self.get(ip_address)
+
+    def __contains__(self, ip_address: str) -> bool:
+        return ip_address in self._by_ip
+
+    def __len__(self) -> int:
+        return len(self._by_ip)
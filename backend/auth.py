@@ -4,8 +4,10 @@ from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from database import get_db
+from database import get_db, get_async_db
 from models import User
 from config import settings
 
@@ -28,7 +30,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def _username_from_token(credentials: HTTPAuthorizationCredentials) -> str:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -43,6 +45,9 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         raise credentials_exception
     return username
 
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return _username_from_token(credentials)
+
 def get_current_user(db: Session = Depends(get_db), username: str = Depends(verify_token)):
     user = db.query(User).filter(User.username == username).first()
     if user is None:
@@ -52,4 +57,15 @@ def get_current_user(db: Session = Depends(get_db), username: str = Depends(veri
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return current_user
\ No newline at end of file
+    return current_user
+
+async def get_current_active_user_async(credentials: HTTPAuthorizationCredentials = Depends(security),
+                                        db: AsyncSession = Depends(get_async_db)):
+    """get_current_active_user for async endpoints; resolves the user without a threadpool thread"""
+    username = _username_from_token(credentials)
+    user = (await db.execute(select(User).where(User.username == username))).scalars().first()
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    if not user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return user
@@ -1,6 +1,8 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from sqlalchemy import and_, or_, func, case, null, select, insert
 from typing import List, Optional
+import json
+from datetime import datetime, timedelta
 import models
 import schemas
 from auth import get_password_hash
@@ -167,42 +169,99 @@ def get_prod_assets(db: Session, team_id: Optional[int] = None):
     """Get all production assets"""
     return get_assets_by_environment(db, "prod", team_id)
 
-def get_assets_stats(db: Session, team_id: Optional[int] = None):
-    """Get asset statistics by environment and criticality"""
-    query = db.query(models.Asset)
+def assets_stats_query(team_id: Optional[int] = None):
+    """
+    One GROUP BY over (environment, criticality, asset_type). The result has a row per
+    distinct combination, so its size does not grow with the number of assets.
+    """
+    query = select(
+        models.Asset.environment, models.Asset.criticality, models.Asset.asset_type, func.count(models.Asset.id)
+    )
     if team_id:
-        query = query.filter(models.Asset.team_id == team_id)
-    
-    assets = query.all()
-    
+        query = query.where(models.Asset.team_id == team_id)
+    return query.group_by(models.Asset.environment, models.Asset.criticality, models.Asset.asset_type)
+
+def assets_stats_from_rows(rows) -> dict:
+    """Fold (environment, criticality, asset_type, count) rows into the asset stats response"""
     stats = {
-        "total": len(assets),
+        "total": 0,
         "by_environment": {},
         "by_criticality": {},
         "by_type": {}
     }
     
-    for asset in assets:
-        # Environment stats
-        env = asset.environment
-        if env not in stats["by_environment"]:
-            stats["by_environment"][env] = 0
-        stats["by_environment"][env] += 1
-        
-        # Criticality stats
-        crit = asset.criticality
-        if crit not in stats["by_criticality"]:
-            stats["by_criticality"][crit] = 0
-        stats["by_criticality"][crit] += 1
-        
-        # Asset type stats
-        asset_type = asset.asset_type or "unknown"
-        if asset_type not in stats["by_type"]:
-            stats["by_type"][asset_type] = 0
-        stats["by_type"][asset_type] += 1
+    for env, crit, asset_type, count in rows:
+        stats["total"] += count
+        stats["by_environment"][env] = stats["by_environment"].get(env, 0) + count
+        stats["by_criticality"][crit] = stats["by_criticality"].get(crit, 0) + count
+        asset_type = asset_type or "unknown"
+        stats["by_type"][asset_type] = stats["by_type"].get(asset_type, 0) + count
     
     return stats
 
+def get_assets_stats(db: Session, team_id: Optional[int] = None):
+    """Get asset statistics by environment and criticality, counted in the database"""
+    return assets_stats_from_rows(db.execute(assets_stats_query(team_id)).all())
+
+def get_team_asset_summaries(db: Session, now: datetime, warning_days: int = 45, overdue_days: int = 60):
+    """
+    Per-team asset counts and review-status buckets in one aggregate query; teams
+    without assets are included with zero counts. A review is overdue after more than
+    overdue_days whole days, in warning after more than warning_days, otherwise current.
+    """
+    asset = models.Asset
+    # More than N whole days since the review means at least N + 1 days have passed
+    overdue_before = now - timedelta(days=overdue_days + 1)
+    warning_before = now - timedelta(days=warning_days + 1)
+    reviewed = asset.last_reviewed_date.isnot(None)
+    
+    def count_where(condition):
+        return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+    
+    query = select(
+        models.Team.id,
+        models.Team.name,
+        models.Team.description,
+        func.count(asset.id).label("total"),
+        count_where(asset.public_facing.is_(True)).label("public_facing"),
+        count_where(asset.id.isnot(None) & asset.last_reviewed_date.is_(None)).label("never_reviewed"),
+        count_where(reviewed & (asset.last_reviewed_date <= overdue_before)).label("overdue"),
+        count_where(reviewed & (asset.last_reviewed_date > overdue_before) & (asset.last_reviewed_date <= warning_before)).label("warning"),
+        count_where(reviewed & (asset.last_reviewed_date > warning_before)).label("current")
+    ).outerjoin(asset, asset.team_id == models.Team.id).group_by(
+        models.Team.id, models.Team.name, models.Team.description
+    ).order_by(models.Team.id)
+    return db.execute(query).all()
+
+def get_team_asset_rows(db: Session, limit_per_team: Optional[int] = None, offset_per_team: int = 0):
+    """
+    Asset rows for the team dashboard with the owner's name joined in, ordered by team
+    and id, in one query. limit_per_team / offset_per_team page each team's list.
+    """
+    query = select(
+        models.Asset.team_id,
+        models.Asset.id,
+        models.Asset.name,
+        models.Asset.ip_address,
+        models.Asset.public_facing,
+        models.Asset.last_reviewed_date,
+        case((models.User.id.is_(None), "Unassigned"), else_=models.User.full_name).label("owner_name")
+    ).outerjoin(models.User, models.User.id == models.Asset.owner_id)
+    
+    if limit_per_team is None and not offset_per_team:
+        return db.execute(query.order_by(models.Asset.team_id, models.Asset.id)).all()
+    
+    position = func.row_number().over(
+        partition_by=models.Asset.team_id, order_by=models.Asset.id
+    ).label("position")
+    numbered = query.add_columns(position).subquery()
+    paged = select(*[column for column in numbered.c if column.name != "position"]).where(
+        numbered.c.position > offset_per_team
+    )
+    if limit_per_team is not None:
+        paged = paged.where(numbered.c.position <= offset_per_team + limit_per_team)
+    return db.execute(paged.order_by(numbered.c.team_id, numbered.c.id)).all()
+
 def get_asset(db: Session, asset_id: int):
     return db.query(models.Asset).filter(models.Asset.id == asset_id).first()
 
@@ -239,11 +298,148 @@ def create_vulnerability(db: Session, vulnerability: schemas.VulnerabilityCreate
     db.refresh(db_vulnerability)
     return db_vulnerability
 
+def _upsert_insert(db: Session):
+    """insert() construct supporting on_conflict_do_update for the session's database"""
+    # SQLite (local development) shares PostgreSQL's ON CONFLICT syntax
+    if db.get_bind().dialect.name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as upsert_insert
+    else:
+        from sqlalchemy.dialects.postgresql import insert as upsert_insert
+    return upsert_insert
+
+def upsert_vulnerabilities(db: Session, rows: List[dict], batch_size: int = 1000) -> int:
+    """
+    Insert or update vulnerability rows keyed on (asset_id, rapid7_vuln_id) with
+    INSERT ... ON CONFLICT DO UPDATE, one statement per batch. Existing rows are only
+    rewritten when their content_hash differs or they need reopening, so unchanged
+    findings cause no row churn; bump their last_seen with touch_vulnerabilities.
+    Existing rows keep their status and discovered_date; resolved rows that are
+    reported again are reopened. Does not commit. Returns the number of rows written.
+    """
+    # A statement may not touch the same row twice, so the last duplicate wins
+    unique_rows = list({(row["asset_id"], row["rapid7_vuln_id"]): row for row in rows}.values())
+    if not unique_rows:
+        return 0
+    
+    upsert_insert = _upsert_insert(db)
+    table = models.Vulnerability.__table__
+    written = 0
+    for start in range(0, len(unique_rows), batch_size):
+        stmt = upsert_insert(table).values(unique_rows[start:start + batch_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.asset_id, table.c.rapid7_vuln_id],
+            set_={
+                "title": stmt.excluded.title,
+                # Synced descriptions live in vulnerability_definitions; this drops older per-row copies
+                "description": stmt.excluded.description,
+                "severity": stmt.excluded.severity,
+                "cvss_score": stmt.excluded.cvss_score,
+                "content_hash": stmt.excluded.content_hash,
+                "last_seen": stmt.excluded.last_seen,
+                "status": case((table.c.status == "resolved", "open"), else_=table.c.status),
+                "resolved_date": case((table.c.status == "resolved", null()), else_=table.c.resolved_date)
+            },
+            where=or_(
+                table.c.content_hash.is_distinct_from(stmt.excluded.content_hash),
+                table.c.status == "resolved"
+            )
+        )
+        # Conflicting rows filtered out by the WHERE clause are not counted
+        written += db.execute(stmt).rowcount
+    return written
+
+def touch_vulnerabilities(db: Session, asset_id: int, vuln_ids: List[str], seen_at: datetime,
+                          batch_size: int = 5000) -> int:
+    """
+    Set last_seen=seen_at on an asset's findings in vuln_ids that do not have it yet,
+    one UPDATE per batch (normally one per asset). Does not commit. Returns rows updated.
+    """
+    touched = 0
+    for start in range(0, len(vuln_ids), batch_size):
+        touched += db.query(models.Vulnerability).filter(
+            models.Vulnerability.asset_id == asset_id,
+            models.Vulnerability.rapid7_vuln_id.in_(vuln_ids[start:start + batch_size]),
+            or_(models.Vulnerability.last_seen.is_(None), models.Vulnerability.last_seen < seen_at)
+        ).update({"last_seen": seen_at}, synchronize_session=False)
+    return touched
+
+def get_vulnerability_definition_refs(db: Session, vuln_ids: Optional[List[str]] = None) -> dict:
+    """Return {rapid7_vuln_id: (title, severity, cvss_score)} for the catalog (or just vuln_ids) in one query"""
+    rows = db.query(
+        models.VulnerabilityDefinition.rapid7_vuln_id,
+        models.VulnerabilityDefinition.title,
+        models.VulnerabilityDefinition.severity,
+        models.VulnerabilityDefinition.cvss_score
+    )
+    if vuln_ids is not None:
+        rows = rows.filter(models.VulnerabilityDefinition.rapid7_vuln_id.in_(vuln_ids))
+    return {vuln_id: (title, severity, cvss_score) for vuln_id, title, severity, cvss_score in rows}
+
+def upsert_vulnerability_definitions(db: Session, rows: List[dict], batch_size: int = 500) -> int:
+    """Insert or refresh catalog rows keyed on rapid7_vuln_id. Does not commit. Returns rows written."""
+    unique_rows = list({row["rapid7_vuln_id"]: row for row in rows}.values())
+    if not unique_rows:
+        return 0
+    
+    upsert_insert = _upsert_insert(db)
+    table = models.VulnerabilityDefinition.__table__
+    for start in range(0, len(unique_rows), batch_size):
+        stmt = upsert_insert(table).values(unique_rows[start:start + batch_size])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.rapid7_vuln_id],
+            set_={
+                column: stmt.excluded[column]
+                for column in ("title", "description", "severity", "cvss_score", "cvss_vector",
+                               "categories", "cves", "published", "modified")
+            } | {"updated_at": func.now()}
+        )
+        db.execute(stmt)
+    return len(unique_rows)
+
+def resolve_missing_vulnerabilities(db: Session, asset_id: int, seen_at: datetime) -> int:
+    """
+    Mark an asset's open vulnerabilities as resolved when the latest full pull,
+    which stamped last_seen=seen_at on everything reported, did not include them.
+    One set-based UPDATE; does not commit. Returns the number of rows resolved.
+    """
+    return db.query(models.Vulnerability).filter(
+        models.Vulnerability.asset_id == asset_id,
+        models.Vulnerability.status == "open",
+        or_(models.Vulnerability.last_seen.is_(None), models.Vulnerability.last_seen < seen_at)
+    ).update({"status": "resolved", "resolved_date": seen_at}, synchronize_session=False)
+
+def archive_resolved_vulnerabilities(db: Session, resolved_before: datetime, batch_size: int = 5000) -> int:
+    """
+    Move up to `batch_size` vulnerabilities resolved before `resolved_before` into
+    vulnerability_history. Does not commit. Returns the number of rows moved.
+    """
+    ids = [vuln_id for (vuln_id,) in db.query(models.Vulnerability.id).filter(
+        models.Vulnerability.status == "resolved",
+        models.Vulnerability.resolved_date < resolved_before
+    ).order_by(models.Vulnerability.id).limit(batch_size)]
+    if not ids:
+        return 0
+    
+    source = models.Vulnerability.__table__
+    target = models.VulnerabilityHistory.__table__
+    # Sync bookkeeping such as content_hash is not kept in history
+    columns = [column for column in source.columns if column.name in target.c]
+    db.execute(
+        insert(target).from_select(
+            [column.name for column in columns], select(*columns).where(source.c.id.in_(ids))
+        )
+    )
+    db.query(models.Vulnerability).filter(models.Vulnerability.id.in_(ids)).delete(synchronize_session=False)
+    return len(ids)
+
 def get_vulnerabilities_by_asset(db: Session, asset_id: int):
     return db.query(models.Vulnerability).filter(models.Vulnerability.asset_id == asset_id).all()
 
-def get_vulnerabilities_by_team(db: Session, team_id: int):
-    return db.query(models.Vulnerability).join(models.Asset).filter(models.Asset.team_id == team_id).all()
+def get_vulnerabilities_by_team(db: Session, team_id: int, status: Optional[str] = None):
+    query = db.query(models.Vulnerability).join(models.Asset).filter(models.Asset.team_id == team_id)
+    if status:
+        query = query.filter(models.Vulnerability.status == status)
+    return query.all()
 
 def create_scan(db: Session, scan: schemas.ScanCreate, user_id: int):
     db_scan = models.Scan(**scan.dict(), initiated_by=user_id)
@@ -253,4 +449,29 @@ def create_scan(db: Session, scan: schemas.ScanCreate, user_id: int):
     return db_scan
 
 def get_scans_by_asset(db: Session, asset_id: int):
-    return db.query(models.Scan).filter(models.Scan.asset_id == asset_id).all()
\ No newline at end of file
+    return db.query(models.Scan).filter(models.Scan.asset_id == asset_id).all()
+
+def create_sync_job(db: Session, job_type: str, params: dict, user_id: int, worker: Optional[str] = None):
+    db_job = models.SyncJob(
+        job_type=job_type,
+        status="pending",
+        params=json.dumps(params),
+        requested_by=user_id,
+        worker=worker
+    )
+    db.add(db_job)
+    db.commit()
+    db.refresh(db_job)
+    return db_job
+
+def get_sync_job(db: Session, job_id: int):
+    return db.query(models.SyncJob).filter(models.SyncJob.id == job_id).first()
+
+def get_sync_jobs(db: Session, skip: int = 0, limit: int = 50, job_type: Optional[str] = None, status: Optional[str] = None):
+    """Get sync jobs, newest first"""
+    query = db.query(models.SyncJob)
+    if job_type:
+        query = query.filter(models.SyncJob.job_type == job_type)
+    if status:
+        query = query.filter(models.SyncJob.status == status)
+    return query.order_by(models.SyncJob.id.desc()).offset(skip).limit(limit).all()
@@ -0,0 +1,40 @@
+from typing import Optional
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+import models
+import crud
+
+# AsyncSession versions of the hot read paths in crud. Async sessions cannot lazy load,
+# so relationships the response schemas serialize are loaded eagerly here.
+
+def _asset_options():
+    return (
+        selectinload(models.Asset.team),
+        selectinload(models.Asset.owner).selectinload(models.User.team)
+    )
+
+async def get_assets(db: AsyncSession, skip: int = 0, limit: int = 100, team_id: Optional[int] = None,
+                     environment: Optional[str] = None, criticality: Optional[str] = None):
+    query = select(models.Asset).options(*_asset_options())
+    if team_id:
+        query = query.where(models.Asset.team_id == team_id)
+    if environment:
+        query = query.where(models.Asset.environment == environment)
+    if criticality:
+        query = query.where(models.Asset.criticality == criticality)
+    result = await db.execute(query.offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def get_assets_stats(db: AsyncSession, team_id: Optional[int] = None):
+    """Get asset statistics by environment and criticality, counted in the database"""
+    rows = (await db.execute(crud.assets_stats_query(team_id))).all()
+    return crud.assets_stats_from_rows(rows)
+
+async def get_vulnerabilities_by_team(db: AsyncSession, team_id: int, status: Optional[str] = None):
+    # Vulnerability.definition is a selectin relationship, which async sessions load eagerly
+    query = select(models.Vulnerability).join(models.Asset).where(models.Asset.team_id == team_id)
+    if status:
+        query = query.where(models.Vulnerability.status == status)
+    result = await db.execute(query)
+    return result.scalars().all()
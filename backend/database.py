@@ -1,16 +1,248 @@
-from sqlalchemy import create_engine
+import itertools
+import threading
+import time
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 from config import settings
 
-engine = create_engine(settings.database_url)
+# Async drivers used for the AsyncSession path, by synchronous URL backend
+ASYNC_DRIVERS = {"postgresql": "postgresql+asyncpg", "sqlite": "sqlite+aiosqlite"}
+
+
+class PoolMetrics:
+    """Checkout wait times and connection counters for the engine's pool, fed by pool events"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {
+            "checkouts": 0,
+            "checkout_timeouts": 0,
+            "connections_opened": 0,
+            "connections_invalidated": 0,
+            "peak_checked_out": 0
+        }
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            self._stats["checkout_timeouts" if timed_out else "checkouts"] += 1
+            self._wait_total += seconds
+            self._wait_max = max(self._wait_max, seconds)
+
+    def record(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def record_checked_out(self, checked_out: int):
+        with self._lock:
+            self._stats["peak_checked_out"] = max(self._stats["peak_checked_out"], checked_out)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            waits = self._stats["checkouts"] + self._stats["checkout_timeouts"]
+            return {
+                **self._stats,
+                "wait_seconds_total": round(self._wait_total, 4),
+                "wait_seconds_avg": round(self._wait_total / waits, 6) if waits else 0,
+                "wait_seconds_max": round(self._wait_max, 4)
+            }
+
+
+pool_metrics = PoolMetrics()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a free connection"""
+
+    def _do_get(self):
+        start = time.monotonic()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            pool_metrics.record_wait(time.monotonic() - start, timed_out=True)
+            raise
+        pool_metrics.record_wait(time.monotonic() - start)
+        return connection
+
+
+def _engine_options(url: str, timed: bool = True) -> Dict:
+    """Pool configuration from settings; SQLite (local development) keeps SQLAlchemy's own pool"""
+    options = {"pool_pre_ping": settings.database_pool_pre_ping}
+    if not url.startswith("sqlite"):
+        options.update(
+            pool_size=settings.database_pool_size,
+            max_overflow=settings.database_max_overflow,
+            pool_timeout=settings.database_pool_timeout,
+            pool_recycle=settings.database_pool_recycle
+        )
+        if timed:
+            options["poolclass"] = TimedQueuePool
+    return options
+
+
+engine = create_engine(settings.database_url, **_engine_options(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.record("connections_opened")
+
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    if isinstance(engine.pool, QueuePool):
+        pool_metrics.record_checked_out(engine.pool.checkedout())
+
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    # Includes connections found dead by pre-ping, e.g. after a failover
+    pool_metrics.record("connections_invalidated")
+
+
+class ReadOnlySession(Session):
+    """Session class for read replicas; flushing pending changes raises instead of writing"""
+
+
+@event.listens_for(ReadOnlySession, "before_flush")
+def _reject_writes(session, flush_context, instances):
+    raise RuntimeError("Read replica sessions are read-only; use get_db for writes")
+
+
+# Read replicas (DATABASE_REPLICA_URLS); read-only routes spread their sessions across them round-robin
+replica_urls = [url.strip() for url in settings.database_replica_urls.split(",") if url.strip()]
+replica_engines = [create_engine(url, **_engine_options(url, timed=False)) for url in replica_urls]
+_replica_sessions = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica, class_=ReadOnlySession) for replica in replica_engines
+]
+_replica_cycle = itertools.cycle(range(len(_replica_sessions)))
+_replica_lock = threading.Lock()
+
+
+def _next_replica() -> Optional[int]:
+    """Index of the replica the next read session should use, or None without replicas"""
+    if not _replica_sessions:
+        return None
+    with _replica_lock:
+        return next(_replica_cycle)
+
+
+def _pool_occupancy(pool) -> Dict:
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "pool_timeout": pool.timeout(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": pool.overflow()
+        })
+    return stats
+
+
+def get_pool_stats() -> Dict:
+    """Report current pool occupancy, the configured limits and checkout metrics"""
+    stats = {**_pool_occupancy(engine.pool), "pre_ping": settings.database_pool_pre_ping}
+    if isinstance(engine.pool, TimedQueuePool):
+        stats.update({
+            "max_overflow": settings.database_max_overflow,
+            "pool_recycle": settings.database_pool_recycle
+        })
+    stats.update(pool_metrics.get_stats())
+    if replica_engines:
+        stats["replicas"] = [_pool_occupancy(replica.pool) for replica in replica_engines]
+    if _async_engine is not None:
+        stats["async"] = _pool_occupancy(_async_engine.pool)
+        if _async_replica_engines:
+            stats["async"]["replicas"] = [_pool_occupancy(replica.pool) for replica in _async_replica_engines]
+    return stats
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+def get_read_db():
+    """
+    Session for read-only routes: the next read replica when DATABASE_REPLICA_URLS is set,
+    otherwise the primary. Routes that write, or read back what they just wrote, use get_db.
+    """
+    replica = _next_replica()
+    db = SessionLocal() if replica is None else _replica_sessions[replica]()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+_async_engine: Optional[AsyncEngine] = None
+_async_session_factory: Optional[async_sessionmaker] = None
+_async_replica_engines: List[AsyncEngine] = []
+_async_replica_sessions: List[async_sessionmaker] = []
+_async_lock = threading.Lock()
+
+
+def _create_async_engine(url: str) -> AsyncEngine:
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"No async driver configured for {backend} databases")
+    return create_async_engine(parsed.set(drivername=ASYNC_DRIVERS[backend]), **_engine_options(url, timed=False))
+
+
+def get_async_engine() -> AsyncEngine:
+    """
+    Return the async engine for the configured database, created on first use (with
+    its replicas) so the app still starts where the async driver (asyncpg / aiosqlite)
+    is not installed. It has its own pool, sized by the same settings as the synchronous engine.
+    """
+    global _async_engine, _async_session_factory, _async_replica_engines, _async_replica_sessions
+    with _async_lock:
+        if _async_engine is None:
+            _async_engine = _create_async_engine(settings.database_url)
+            _async_session_factory = async_sessionmaker(_async_engine, expire_on_commit=False)
+            _async_replica_engines = [_create_async_engine(url) for url in replica_urls]
+            _async_replica_sessions = [
+                async_sessionmaker(replica, expire_on_commit=False, sync_session_class=ReadOnlySession)
+                for replica in _async_replica_engines
+            ]
+        return _async_engine
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """AsyncSession dependency for endpoints that should not hold a threadpool thread while waiting on the database"""
+    get_async_engine()
+    async with _async_session_factory() as db:
+        yield db
+
+
+async def get_async_read_db() -> AsyncIterator[AsyncSession]:
+    """get_read_db for async endpoints: an AsyncSession on the next read replica, or the primary"""
+    get_async_engine()
+    replica = _next_replica()
+    factory = _async_session_factory if replica is None else _async_replica_sessions[replica]
+    async with factory() as db:
+        yield db
+
+
+async def dispose_async_engine():
+    """Close the async engines' pooled connections, if they were ever created"""
+    global _async_engine, _async_session_factory, _async_replica_engines, _async_replica_sessions
+    if _async_engine is not None:
+        for async_engine in [_async_engine, *_async_replica_engines]:
+            await async_engine.dispose()
+        _async_engine = _async_session_factory = None
+        _async_replica_engines, _async_replica_sessions = [], []
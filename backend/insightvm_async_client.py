@@ -0,0 +1,321 @@
+import asyncio
+import httpx
+import json
+from typing import Dict, List, Optional, AsyncIterator, Awaitable, Hashable
+from collections import deque
+from insightvm_client import BaseInsightVMClient, InsightVMError, insightvm_client
+from insightvm_support import RetryPolicy, RateLimiter, ResponseCache, AsyncSingleFlight
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AsyncInsightVMClient(BaseInsightVMClient):
+    """
+    Asyncio Rapid7 InsightVM API Client
+    Same method surface as InsightVMClient: endpoint methods return awaitables
+    and iter_* methods return async iterators.
+    """
+
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None, password: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limiter: Optional[RateLimiter] = None,
+                 response_cache: Optional[ResponseCache] = None, transport: Optional[httpx.AsyncBaseTransport] = None):
+        super().__init__(base_url, username, password, retry_policy, rate_limiter, response_cache)
+
+        # Optional transport override, e.g. httpx.MockTransport or a local stub server
+        self._transport = transport
+        self._client = None
+        self.single_flight = AsyncSingleFlight()
+        self._connection_counters = {"requests": 0, "traced": 0, "opened": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled async HTTP client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            limits = httpx.Limits(
+                max_connections=self.pool_maxsize,
+                max_keepalive_connections=self.pool_connections,
+                keepalive_expiry=self.pool_keepalive
+            )
+            self._client = httpx.AsyncClient(
+                headers=self.headers,
+                limits=limits,
+                verify=False,  # Disable SSL verification for internal endpoints
+                transport=self._transport
+            )
+        return self._client
+
+    def _record_connection(self, events: List[str]):
+        """
+        Count one sent request from the httpcore trace events it produced. Only traced
+        requests count toward reuse; a transport that emits no events (e.g. a mock) tells
+        nothing about whether a connection was reused.
+        """
+        self._connection_counters["requests"] += 1
+        if events:
+            self._connection_counters["traced"] += 1
+            if any(name.startswith("connection.connect_") and name.endswith(".complete") for name in events):
+                self._connection_counters["opened"] += 1
+
+    def get_connection_stats(self) -> Dict:
+        """Report how many requests reused a pooled connection versus opened a new one"""
+        traced = self._connection_counters["traced"]
+        opened = self._connection_counters["opened"]
+        reused = traced - opened
+        return {
+            "requests": self._connection_counters["requests"],
+            "traced_requests": traced,
+            "connections_opened": opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / traced, 4) if traced else 0,
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "keepalive_seconds": self.pool_keepalive
+        }
+
+    async def aclose(self):
+        """Close pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def _send(self, method: str, url: str, endpoint: str, data: Optional[Dict], timeout: int):
+        """Send one attempt, returning (response, None) or (None, error dict) on transport failure"""
+        try:
+            events = []
+
+            async def trace(event_name: str, info: Dict):
+                events.append(event_name)
+
+            async with self.rate_limiter.async_slot():
+                try:
+                    response = await self._get_client().request(
+                        method,
+                        url,
+                        json=data if data else None,
+                        timeout=timeout,
+                        extensions={"trace": trace}
+                    )
+                finally:
+                    self._record_connection(events)
+            return response, None
+
+        except httpx.TimeoutException:
+            logger.error(f"InsightVM API request timed out for {endpoint}")
+            return None, {"error": "InsightVM API request timed out"}
+        except httpx.NetworkError:
+            logger.error(f"Failed to connect to InsightVM API for {endpoint}")
+            return None, {"error": "Failed to connect to InsightVM API"}
+        except httpx.HTTPError as e:
+            logger.error(f"InsightVM API request failed for {endpoint}: {e}")
+            return None, {"error": f"InsightVM API error: {str(e)}"}
+
+    async def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None, timeout: int = 30,
+                            use_cache: bool = True) -> Dict:
+        """
+        Make HTTP request to InsightVM API, serving cached GETs and coalescing identical in-flight reads.
+        use_cache=False always reads upstream and leaves the cache untouched, for callers that need current data.
+        """
+        url = self._build_url(endpoint, params)
+
+        if use_cache and method.upper() == "GET":
+            cached = self.response_cache.get(endpoint, url)
+            if cached is not None:
+                return cached
+
+        if self.coalesce_requests and self.retry_policy.is_idempotent(method, endpoint):
+            key = (method.upper(), url, json.dumps(data, sort_keys=True) if data else None)
+            return await self.single_flight.do(key, lambda: self._execute(method, endpoint, url, data, timeout, use_cache))
+        return await self._execute(method, endpoint, url, data, timeout, use_cache)
+
+    async def _execute(self, method: str, endpoint: str, url: str, data: Optional[Dict], timeout: int, use_cache: bool = True) -> Dict:
+        """Send the request, retrying 429/5xx per the retry policy, and cache the result"""
+        attempt = 0
+        while True:
+            response, error = await self._send(method, url, endpoint, data, timeout)
+            status_code = response.status_code if response is not None else None
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+
+            delay = self.retry_policy.next_delay(method, endpoint, attempt, status_code, retry_after)
+            if delay is None:
+                break
+            logger.warning(f"Retrying InsightVM {method} {endpoint} in {delay:.2f}s (attempt {attempt + 1}, status {status_code or 'transport error'})")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+        if response is None:
+            return error
+
+        result = self._handle_response(method, endpoint, response)
+        self._update_cache(method, endpoint, url, result, use_cache)
+        return result
+
+    async def _fetch_page(self, method: str, endpoint: str, params: Optional[Dict], data: Optional[Dict],
+                          page: int, page_size: int, use_cache: bool = True) -> Dict:
+        """Fetch a single page, raising InsightVMError on failure"""
+        page_params = dict(params or {})
+        page_params.update({"page": page, "size": page_size})
+        result = await self._make_request(method, endpoint, params=page_params, data=data, use_cache=use_cache)
+        if result.get("error"):
+            raise InsightVMError(f"Failed to get page {page} of {endpoint}: {result['error']}")
+        return result
+
+    async def iter_pages(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None,
+                         page_size: int = 500, max_items: Optional[int] = None, concurrency: Optional[int] = None,
+                         start_page: int = 0, use_cache: bool = True) -> AsyncIterator[Dict]:
+        """
+        Yield successive pages of a list endpoint until page.totalPages is exhausted.
+        Remaining pages are prefetched as up to `concurrency` tasks and yielded in order.
+        start_page skips the pages before it, e.g. to resume an interrupted walk, and
+        use_cache=False reads every page upstream.
+        """
+        max_pages = None
+        if max_items is not None:
+            max_pages = -(-max_items // page_size) if max_items > 0 else 0
+            if max_pages == 0:
+                return
+
+        first_page = await self._fetch_page(method, endpoint, params, data, start_page, page_size, use_cache)
+        yield first_page
+
+        total_pages = first_page.get("page", {}).get("totalPages")
+        if total_pages is None:
+            # Without paging metadata walk sequentially; a short page is the last one
+            page = start_page
+            result = first_page
+            while len(result.get("resources", [])) >= page_size:
+                page += 1
+                if max_pages is not None and page >= max_pages:
+                    break
+                result = await self._fetch_page(method, endpoint, params, data, page, page_size, use_cache)
+                yield result
+            return
+
+        last_page = total_pages if max_pages is None else min(total_pages, max_pages)
+        workers = max(min(concurrency or self.page_concurrency, last_page - start_page - 1), 1)
+
+        # Sliding window keeps at most `workers` pages in flight or buffered
+        pending = deque()
+        next_page = start_page + 1
+        try:
+            while next_page < last_page or pending:
+                while next_page < last_page and len(pending) < workers:
+                    pending.append(asyncio.ensure_future(
+                        self._fetch_page(method, endpoint, params, data, next_page, page_size, use_cache)
+                    ))
+                    next_page += 1
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _iter_resources(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None,
+                              page_size: int = 500, max_items: Optional[int] = None, concurrency: Optional[int] = None,
+                              use_cache: bool = True) -> AsyncIterator[Dict]:
+        """Yield resources one at a time, holding at most the prefetch window of pages in memory"""
+        yielded = 0
+        async for page in self.iter_pages(method, endpoint, params=params, data=data, page_size=page_size,
+                                          max_items=max_items, concurrency=concurrency, use_cache=use_cache):
+            for resource in page.get("resources", []):
+                if max_items is not None and yielded >= max_items:
+                    return
+                yield resource
+                yielded += 1
+
+    async def gather(self, calls: Dict[Hashable, Awaitable[Dict]], timeout: Optional[float] = None,
+                     concurrency: Optional[int] = None) -> Dict[Hashable, Dict]:
+        """
+        Await several client calls concurrently, at most `concurrency` at a time,
+        each bounded by its own timeout. Returns results under the same keys; a
+        call that times out or raises yields an {"error": ...} dict instead of
+        failing the whole batch.
+        """
+        timeout = self.fanout_timeout if timeout is None else timeout
+        semaphore = asyncio.Semaphore(max(concurrency or self.fanout_concurrency, 1))
+
+        async def _bounded(name: Hashable, call: Awaitable[Dict]) -> Dict:
+            async with semaphore:
+                try:
+                    return await asyncio.wait_for(call, timeout=timeout)
+                except asyncio.TimeoutError:
+                    logger.error(f"InsightVM call '{name}' timed out after {timeout}s")
+                    return {"error": f"InsightVM call timed out after {timeout}s"}
+                except Exception as e:
+                    logger.error(f"InsightVM call '{name}' failed: {e}")
+                    return {"error": str(e)}
+
+        results = await asyncio.gather(*(_bounded(name, call) for name, call in calls.items()))
+        return dict(zip(calls.keys(), results))
+
+    async def get_site_asset_counts(self, sites: List[Dict]) -> Dict[int, int]:
+        """
+        Return {site_id: asset count} for the given site resources.
+        Counts come from each site's own "assets" field when the console reports it;
+        only sites without one fall back to a size=0 sites/{id}/assets call. Those
+        calls run concurrently and are cached per site under the
+        sites/*/assets?*size=0 TTL.
+        """
+        counts = {}
+        missing = {}
+        for site in sites:
+            site_id = site.get("id")
+            if site_id is None:
+                continue
+            if isinstance(site.get("assets"), int):
+                counts[site_id] = site["assets"]
+            else:
+                missing[site_id] = self.get_site_assets(site_id, size=0)
+
+        if missing:
+            results = await self.gather(missing)
+            for site_id, result in results.items():
+                counts[site_id] = 0 if result.get("error") else result.get("page", {}).get("totalResources", 0)
+        return counts
+
+    async def test_connection(self) -> Dict:
+        """Test connectivity to InsightVM API"""
+        try:
+            response = await self._make_request("GET", "administration/info")
+            return {
+                "status": "connected",
+                "message": "Successfully connected to InsightVM",
+                "server_info": response
+            }
+        except Exception as e:
+            return {
+                "status": "failed",
+                "message": f"Failed to connect to InsightVM: {str(e)}"
+            }
+
+    async def get_assessed_assets(self, page: int = 0, size: int = 500) -> Dict:
+        """Get assessed assets from InsightVM (assets that have been scanned/assessed)"""
+        try:
+            params = {"page": page, "size": size}
+            assets_response = await self._make_request("GET", "assets", params=params)
+
+            # If the basic assets call fails, try the search method
+            if assets_response.get("error"):
+                logger.warning(f"Basic assets call failed: {assets_response.get('error')}, trying search method")
+                search_data = {
+                    "match": "all",
+                    "filters": [
+                        {
+                            "field": "last-scan-date",
+                            "operator": "is-not-empty"
+                        }
+                    ]
+                }
+                return await self._make_request("POST", "assets/search", params=params, data=search_data)
+
+            return assets_response
+
+        except Exception as e:
+            logger.error(f"Failed to get assessed assets: {e}")
+            return {"error": f"Failed to get assessed assets: {str(e)}"}
+
+# Create global instance; shares the sync client's retry budget, rate limiter and cache
+insightvm_async_client = AsyncInsightVMClient(
+    retry_policy=insightvm_client.retry_policy,
+    rate_limiter=insightvm_client.rate_limiter,
+    response_cache=insightvm_client.response_cache
+)
@@ -1,7 +1,13 @@
 import requests
+from requests.adapters import HTTPAdapter
 import base64
-from typing import List, Dict, Optional, Any
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Any, Iterator
 from config import settings
+from insightvm_support import RetryPolicy, RateLimiter, ResponseCache, SingleFlight
 import logging
 from datetime import datetime, timedelta
 import json
@@ -13,16 +19,23 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
 logger = logging.getLogger(__name__)
 
-class InsightVMClient:
+class InsightVMError(Exception):
+    """Raised when an InsightVM page cannot be retrieved during iteration"""
+    pass
+
+class BaseInsightVMClient:
     """
-    Rapid7 InsightVM API Client
+    Rapid7 InsightVM API surface shared by the sync and async clients.
+    Endpoint methods delegate to the transport's _make_request and _iter_resources.
     Documentation: https://help.rapid7.com/insightvm/en-us/api/index.html
     """
     
-    def __init__(self):
-        self.base_url = settings.rapid7_insightvm_base_url
-        self.username = settings.rapid7_insightvm_username
-        self.password = settings.rapid7_insightvm_password
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None, password: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limiter: Optional[RateLimiter] = None,
+                 response_cache: Optional[ResponseCache] = None):
+        self.base_url = base_url or settings.rapid7_insightvm_base_url
+        self.username = username or settings.rapid7_insightvm_username
+        self.password = password or settings.rapid7_insightvm_password
         
         if not self.username or not self.password:
             raise Exception("InsightVM credentials not configured. Set RAPID7_INSIGHTVM_USERNAME and RAPID7_INSIGHTVM_PASSWORD environment variables.")
@@ -36,84 +49,103 @@ class InsightVMClient:
             "Content-Type": "application/json",
             "Accept": "application/json"
         }
+        
+        # Connection pool tuning, applied by each transport's pooled session
+        self.pool_connections = settings.insightvm_pool_connections
+        self.pool_maxsize = settings.insightvm_pool_maxsize
+        self.pool_keepalive = settings.insightvm_pool_keepalive
+        
+        # Number of pages fetched in parallel once totalPages is known
+        self.page_concurrency = settings.insightvm_page_concurrency
+        
+        # Backoff for 429/5xx; pass a shared policy to share its retry budget across clients
+        self.retry_policy = retry_policy or RetryPolicy()
+        
+        # Throttle to stay under the console's rate limit; share one limiter across clients
+        self.rate_limiter = rate_limiter or RateLimiter()
+        
+        # TTL cache for read-only GETs; share one cache across clients
+        self.response_cache = response_cache or ResponseCache()
+        
+        # Concurrent identical reads share one upstream call
+        self.coalesce_requests = settings.insightvm_coalesce_requests
+        
+        # Per-call timeout and parallelism when an endpoint fans out several calls at once
+        self.fanout_timeout = settings.insightvm_fanout_timeout
+        self.fanout_concurrency = settings.insightvm_fanout_concurrency
     
-    def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None, timeout: int = 30) -> Dict:
-        """Make HTTP request to InsightVM API"""
+    def _build_url(self, endpoint: str, params: Optional[Dict] = None) -> str:
+        """Build the full request URL including query parameters"""
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         
         # Add query parameters if provided
         if params:
             url += f"?{urlencode(params)}"
+        return url
+    
+    def _update_cache(self, method: str, endpoint: str, url: str, result: Dict, use_cache: bool = True):
+        """Cache successful GETs; a successful write invalidates cached reads of the same resource"""
+        if method.upper() == "GET":
+            if use_cache:
+                self.response_cache.set(endpoint, url, result)
+        elif not result.get("error") and not endpoint.rstrip("/").endswith("search"):
+            resource = endpoint.strip("/").split("/")[0]
+            self.response_cache.invalidate(resource)
+            self.response_cache.invalidate(f"{resource}/*")
+    
+    def invalidate_cache(self, pattern: Optional[str] = None) -> int:
+        """Drop cached responses for endpoints matching a glob pattern, or all of them"""
+        return self.response_cache.invalidate(pattern)
+    
+    def get_single_flight_stats(self) -> Dict:
+        """Report how many reads were executed versus coalesced onto an in-flight call"""
+        return self.single_flight.get_stats()
+    
+    def get_cache_stats(self) -> Dict:
+        """Report hit, miss and eviction counters from the response cache"""
+        return self.response_cache.get_stats()
+    
+    def get_retry_stats(self) -> Dict:
+        """Report retry counters from the retry policy"""
+        return self.retry_policy.get_stats()
+    
+    def get_rate_limit_stats(self) -> Dict:
+        """Report throttling counters from the rate limiter"""
+        return self.rate_limiter.get_stats()
+    
+    def _handle_response(self, method: str, endpoint: str, response: Any) -> Dict:
+        """Translate an HTTP response (requests or httpx) into the client's result dict"""
+        # Handle different response codes
+        if response.status_code == 401:
+            return {"error": "Invalid InsightVM credentials or unauthorized access"}
+        elif response.status_code == 403:
+            return {"error": "Insufficient permissions for this InsightVM operation"}
+        elif response.status_code == 404:
+            return {"error": "InsightVM resource not found"}
+        elif response.status_code == 422:
+            error_detail = "Invalid request parameters"
+            try:
+                error_json = response.json()
+                error_detail = error_json.get("message", error_detail)
+                logger.error(f"InsightVM 422 error details: {error_json}")
+            except:
+                pass
+            logger.error(f"InsightVM 422 error for {method} {endpoint}: {error_detail}")
+            return {"error": f"InsightVM API 422 error: {error_detail}"}
+        elif response.status_code == 429:
+            return {"error": "InsightVM API rate limit exceeded. Please try again later"}
+        elif response.status_code >= 500:
+            return {"error": f"InsightVM API server error: {response.status_code}"}
+        elif response.status_code >= 400:
+            return {"error": f"InsightVM API HTTP error: {response.status_code} for {method} {endpoint}"}
         
-        try:
-            response = requests.request(
-                method, 
-                url, 
-                headers=self.headers, 
-                json=data if data else None,
-                timeout=timeout,
-                verify=False  # Disable SSL verification for internal endpoints
-            )
-            
-            # Handle different response codes
-            if response.status_code == 401:
-                return {"error": "Invalid InsightVM credentials or unauthorized access"}
-            elif response.status_code == 403:
-                return {"error": "Insufficient permissions for this InsightVM operation"}
-            elif response.status_code == 404:
-                return {"error": "InsightVM resource not found"}
-            elif response.status_code == 422:
-                error_detail = "Invalid request parameters"
-                try:
-                    error_json = response.json()
-                    error_detail = error_json.get("message", error_detail)
-                    logger.error(f"InsightVM 422 error details: {error_json}")
-                except:
-                    pass
-                logger.error(f"InsightVM 422 error for {method} {endpoint}: {error_detail}")
-                return {"error": f"InsightVM API 422 error: {error_detail}"}
-            elif response.status_code == 429:
-                return {"error": "InsightVM API rate limit exceeded. Please try again later"}
-            elif response.status_code >= 500:
-                return {"error": f"InsightVM API server error: {response.status_code}"}
-                
+        if response.content:
             try:
-                response.raise_for_status()
-            except requests.exceptions.HTTPError as e:
-                return {"error": f"InsightVM API HTTP error: {e}"}
-            
-            if response.content:
-                try:
-                    return response.json()
-                except json.JSONDecodeError:
-                    return {"raw_response": response.text}
-            else:
-                return {"message": "Operation completed successfully"}
-                
-        except requests.exceptions.Timeout:
-            logger.error(f"InsightVM API request timed out for {endpoint}")
-            return {"error": "InsightVM API request timed out"}
-        except requests.exceptions.ConnectionError:
-            logger.error(f"Failed to connect to InsightVM API for {endpoint}")
-            return {"error": "Failed to connect to InsightVM API"}
-        except requests.exceptions.RequestException as e:
-            logger.error(f"InsightVM API request failed for {endpoint}: {e}")
-            return {"error": f"InsightVM API error: {str(e)}"}
-    
-    def test_connection(self) -> Dict:
-        """Test connectivity to InsightVM API"""
-        try:
-            response = self._make_request("GET", "administration/info")
-            return {
-                "status": "connected",
-                "message": "Successfully connected to InsightVM",
-                "server_info": response
-            }
-        except Exception as e:
-            return {
-                "status": "failed",
-                "message": f"Failed to connect to InsightVM: {str(e)}"
-            }
+                return response.json()
+            except json.JSONDecodeError:
+                return {"raw_response": response.text}
+        else:
+            return {"message": "Operation completed successfully"}
     
     # Asset Management APIs
     def get_assets(self, page: int = 0, size: int = 500, filters: Optional[Dict] = None) -> Dict:
@@ -123,33 +155,9 @@ class InsightVMClient:
             params.update(filters)
         return self._make_request("GET", "assets", params=params)
     
-    def get_assessed_assets(self, page: int = 0, size: int = 500) -> Dict:
-        """Get assessed assets from InsightVM (assets that have been scanned/assessed)"""
-        try:
-            # First try to get all assets and filter for those with scan dates
-            params = {"page": page, "size": size}
-            assets_response = self._make_request("GET", "assets", params=params)
-            
-            # If the basic assets call fails, try the search method
-            if assets_response.get("error"):
-                logger.warning(f"Basic assets call failed: {assets_response.get('error')}, trying search method")
-                search_data = {
-                    "match": "all",
-                    "filters": [
-                        {
-                            "field": "last-scan-date",
-                            "operator": "is-not-empty"
-                        }
-                    ]
-                }
-                params = {"page": page, "size": size}
-                return self._make_request("POST", "assets/search", params=params, data=search_data)
-            
-            return assets_response
-            
-        except Exception as e:
-            logger.error(f"Failed to get assessed assets: {e}")
-            return {"error": f"Failed to get assessed assets: {str(e)}"}
+    def iter_assets(self, page_size: int = 500, max_items: Optional[int] = None, filters: Optional[Dict] = None) -> Iterator[Dict]:
+        """Iterate over all assets across pages"""
+        return self._iter_resources("GET", "assets", params=filters, page_size=page_size, max_items=max_items)
     
     def get_asset(self, asset_id: int) -> Dict:
         """Get specific asset details"""
@@ -170,6 +178,20 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("POST", "assets/search", params=params, data=search_data)
     
+    def iter_search_assets(self, query: str, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all assets matching an IP query across pages"""
+        search_data = {
+            "match": "all",
+            "filters": [
+                {
+                    "field": "ip-address",
+                    "operator": "contains",
+                    "value": query
+                }
+            ]
+        }
+        return self._iter_resources("POST", "assets/search", data=search_data, page_size=page_size, max_items=max_items)
+    
     def search_assets_by_ip(self, ip_address: str) -> Dict:
         """Search assets by IP address"""
         search_data = {
@@ -190,6 +212,10 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("GET", "sites", params=params)
     
+    def iter_sites(self, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all sites across pages"""
+        return self._iter_resources("GET", "sites", page_size=page_size, max_items=max_items)
+    
     def get_site(self, site_id: int) -> Dict:
         """Get specific site details"""
         return self._make_request("GET", f"sites/{site_id}")
@@ -199,6 +225,10 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("GET", f"sites/{site_id}/assets", params=params)
     
+    def iter_site_assets(self, site_id: int, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all assets of a site across pages"""
+        return self._iter_resources("GET", f"sites/{site_id}/assets", page_size=page_size, max_items=max_items)
+    
     # Scan Management APIs
     def get_scans(self, page: int = 0, size: int = 500, active: Optional[bool] = None) -> Dict:
         """Get scans"""
@@ -207,6 +237,13 @@ class InsightVMClient:
             params["active"] = str(active).lower()
         return self._make_request("GET", "scans", params=params)
     
+    def iter_scans(self, page_size: int = 500, max_items: Optional[int] = None, active: Optional[bool] = None) -> Iterator[Dict]:
+        """Iterate over all scans across pages"""
+        params = {}
+        if active is not None:
+            params["active"] = str(active).lower()
+        return self._iter_resources("GET", "scans", params=params, page_size=page_size, max_items=max_items)
+    
     def get_scan(self, scan_id: int) -> Dict:
         """Get specific scan details"""
         return self._make_request("GET", f"scans/{scan_id}")
@@ -247,6 +284,13 @@ class InsightVMClient:
             params["severity"] = severity
         return self._make_request("GET", "vulnerabilities", params=params)
     
+    def iter_vulnerabilities(self, page_size: int = 500, max_items: Optional[int] = None, severity: Optional[str] = None) -> Iterator[Dict]:
+        """Iterate over all vulnerabilities across pages"""
+        params = {}
+        if severity:
+            params["severity"] = severity
+        return self._iter_resources("GET", "vulnerabilities", params=params, page_size=page_size, max_items=max_items)
+    
     def get_vulnerability(self, vuln_id: str) -> Dict:
         """Get specific vulnerability details"""
         return self._make_request("GET", f"vulnerabilities/{vuln_id}")
@@ -256,6 +300,12 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("GET", f"assets/{asset_id}/vulnerabilities", params=params)
     
+    def iter_asset_vulnerabilities(self, asset_id: int, page_size: int = 500, max_items: Optional[int] = None,
+                                   use_cache: bool = True) -> Iterator[Dict]:
+        """Iterate over all vulnerabilities of an asset across pages"""
+        return self._iter_resources("GET", f"assets/{asset_id}/vulnerabilities", page_size=page_size, max_items=max_items,
+                                    use_cache=use_cache)
+    
     def search_vulnerabilities_by_severity(self, severity: str = "critical", page: int = 0, size: int = 500) -> Dict:
         """Search vulnerabilities by severity level"""
         search_data = {
@@ -271,6 +321,20 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("POST", "vulnerabilities/search", params=params, data=search_data)
     
+    def iter_vulnerabilities_by_severity(self, severity: str = "critical", page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all vulnerabilities of a severity level across pages"""
+        search_data = {
+            "match": "all",
+            "filters": [
+                {
+                    "field": "severity",
+                    "operator": "is",
+                    "value": severity.lower()
+                }
+            ]
+        }
+        return self._iter_resources("POST", "vulnerabilities/search", data=search_data, page_size=page_size, max_items=max_items)
+    
     def get_exploitable_vulnerabilities(self, page: int = 0, size: int = 500) -> Dict:
         """Get vulnerabilities with known exploits"""
         search_data = {
@@ -286,17 +350,39 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("POST", "vulnerabilities/search", params=params, data=search_data)
     
+    def iter_exploitable_vulnerabilities(self, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all vulnerabilities with known exploits across pages"""
+        search_data = {
+            "match": "all",
+            "filters": [
+                {
+                    "field": "exploits",
+                    "operator": "is-greater-than",
+                    "value": 0
+                }
+            ]
+        }
+        return self._iter_resources("POST", "vulnerabilities/search", data=search_data, page_size=page_size, max_items=max_items)
+    
     # Reporting APIs
     def get_reports(self, page: int = 0, size: int = 500) -> Dict:
         """Get available reports"""
         params = {"page": page, "size": size}
         return self._make_request("GET", "reports", params=params)
     
+    def iter_reports(self, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all reports across pages"""
+        return self._iter_resources("GET", "reports", page_size=page_size, max_items=max_items)
+    
     def get_report_instances(self, report_id: int, page: int = 0, size: int = 500) -> Dict:
         """Get instances of a specific report"""
         params = {"page": page, "size": size}
         return self._make_request("GET", f"reports/{report_id}/history", params=params)
     
+    def iter_report_instances(self, report_id: int, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all instances of a report across pages"""
+        return self._iter_resources("GET", f"reports/{report_id}/history", page_size=page_size, max_items=max_items)
+    
     def get_report_details(self, report_id: int) -> Dict:
         """Get details of a specific report"""
         return self._make_request("GET", f"reports/{report_id}")
@@ -322,6 +408,10 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("GET", "report_templates", params=params)
     
+    def iter_report_templates(self, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all report templates across pages"""
+        return self._iter_resources("GET", "report_templates", page_size=page_size, max_items=max_items)
+    
     def generate_report(self, template_id: str, scope: Dict, name: Optional[str] = None) -> Dict:
         """Generate a report"""
         report_data = {
@@ -338,6 +428,10 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("GET", "discovery_connections", params=params)
     
+    def iter_discovery_connections(self, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all discovery connections across pages"""
+        return self._iter_resources("GET", "discovery_connections", page_size=page_size, max_items=max_items)
+    
     def create_discovery_connection(self, name: str, address: str, port: int = 22, credentials: Dict = None) -> Dict:
         """Create a discovery connection"""
         connection_data = {
@@ -355,6 +449,10 @@ class InsightVMClient:
         params = {"page": page, "size": size}
         return self._make_request("GET", "asset_groups", params=params)
     
+    def iter_asset_groups(self, page_size: int = 500, max_items: Optional[int] = None) -> Iterator[Dict]:
+        """Iterate over all asset groups across pages"""
+        return self._iter_resources("GET", "asset_groups", page_size=page_size, max_items=max_items)
+    
     def get_asset_group(self, group_id: int) -> Dict:
         """Get specific asset group"""
         return self._make_request("GET", f"asset_groups/{group_id}")
@@ -370,5 +468,285 @@ class InsightVMClient:
             group_data["searchCriteria"] = search_criteria
         return self._make_request("POST", "asset_groups", data=group_data)
 
+class InsightVMClient(BaseInsightVMClient):
+    """
+    Rapid7 InsightVM API Client
+    Documentation: https://help.rapid7.com/insightvm/en-us/api/index.html
+    """
+    
+    def __init__(self, base_url: Optional[str] = None, username: Optional[str] = None, password: Optional[str] = None,
+                 retry_policy: Optional[RetryPolicy] = None, rate_limiter: Optional[RateLimiter] = None,
+                 response_cache: Optional[ResponseCache] = None):
+        super().__init__(base_url, username, password, retry_policy, rate_limiter, response_cache)
+        
+        self.single_flight = SingleFlight()
+        self._session_lock = threading.Lock()
+        self._session = None
+        self._adapter = None
+        self._session_created = 0.0
+        self._retired_counters = {"requests": 0, "opened": 0}
+    
+    def _new_session(self) -> requests.Session:
+        """Create a keep-alive session backed by a bounded connection pool"""
+        session = requests.Session()
+        session.headers.update(self.headers)
+        session.verify = False
+        
+        # pool_block caps open connections per host at pool_maxsize
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections,
+            pool_maxsize=self.pool_maxsize,
+            pool_block=True
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        
+        self._adapter = adapter
+        self._session_created = time.monotonic()
+        return session
+    
+    def _get_session(self) -> requests.Session:
+        """Return the pooled session, recycling it once the keep-alive lifetime is exceeded"""
+        with self._session_lock:
+            if self._session is not None and self.pool_keepalive > 0:
+                if time.monotonic() - self._session_created > self.pool_keepalive:
+                    self._retire_session()
+            
+            if self._session is None:
+                self._session = self._new_session()
+            return self._session
+    
+    def _retire_session(self):
+        """Close the current session, keeping its counters for connection stats"""
+        counters = self._pool_counters()
+        self._retired_counters["requests"] += counters["requests"]
+        self._retired_counters["opened"] += counters["opened"]
+        self._session.close()
+        self._session = None
+        self._adapter = None
+    
+    def _pool_counters(self) -> Dict[str, int]:
+        """Sum request and new-connection counters across the live host pools"""
+        counters = {"requests": 0, "opened": 0}
+        if self._adapter is None:
+            return counters
+        
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            counters["requests"] += pool.num_requests
+            counters["opened"] += pool.num_connections
+        return counters
+    
+    def get_connection_stats(self) -> Dict:
+        """Report how many requests reused a pooled connection versus opened a new one"""
+        with self._session_lock:
+            counters = self._pool_counters()
+            total_requests = counters["requests"] + self._retired_counters["requests"]
+            opened = counters["opened"] + self._retired_counters["opened"]
+            session_age = time.monotonic() - self._session_created if self._session is not None else 0
+        
+        reused = max(total_requests - opened, 0)
+        return {
+            "requests": total_requests,
+            "connections_opened": opened,
+            "connections_reused": reused,
+            "reuse_ratio": round(reused / total_requests, 4) if total_requests else 0,
+            "pool_connections": self.pool_connections,
+            "pool_maxsize": self.pool_maxsize,
+            "keepalive_seconds": self.pool_keepalive,
+            "session_age_seconds": round(session_age, 1)
+        }
+    
+    def close(self):
+        """Close pooled connections"""
+        with self._session_lock:
+            if self._session is not None:
+                self._retire_session()
+    
+    def _send(self, method: str, url: str, endpoint: str, data: Optional[Dict], timeout: int):
+        """Send one attempt, returning (response, None) or (None, error dict) on transport failure"""
+        try:
+            with self.rate_limiter.slot():
+                response = self._get_session().request(
+                    method, 
+                    url, 
+                    json=data if data else None,
+                    timeout=timeout,
+                    verify=False  # Disable SSL verification for internal endpoints
+                )
+            return response, None
+                
+        except requests.exceptions.Timeout:
+            logger.error(f"InsightVM API request timed out for {endpoint}")
+            return None, {"error": "InsightVM API request timed out"}
+        except requests.exceptions.ConnectionError:
+            logger.error(f"Failed to connect to InsightVM API for {endpoint}")
+            return None, {"error": "Failed to connect to InsightVM API"}
+        except requests.exceptions.RequestException as e:
+            logger.error(f"InsightVM API request failed for {endpoint}: {e}")
+            return None, {"error": f"InsightVM API error: {str(e)}"}
+    
+    def _make_request(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None, timeout: int = 30,
+                      use_cache: bool = True) -> Dict:
+        """
+        Make HTTP request to InsightVM API, serving cached GETs and coalescing identical in-flight reads.
+        use_cache=False always reads upstream and leaves the cache untouched, for callers that need current data.
+        """
+        url = self._build_url(endpoint, params)
+        
+        if use_cache and method.upper() == "GET":
+            cached = self.response_cache.get(endpoint, url)
+            if cached is not None:
+                return cached
+        
+        if self.coalesce_requests and self.retry_policy.is_idempotent(method, endpoint):
+            key = (method.upper(), url, json.dumps(data, sort_keys=True) if data else None)
+            return self.single_flight.do(key, lambda: self._execute(method, endpoint, url, data, timeout, use_cache))
+        return self._execute(method, endpoint, url, data, timeout, use_cache)
+        
+    def _execute(self, method: str, endpoint: str, url: str, data: Optional[Dict], timeout: int, use_cache: bool = True) -> Dict:
+        """Send the request, retrying 429/5xx per the retry policy, and cache the result"""
+        attempt = 0
+        while True:
+            response, error = self._send(method, url, endpoint, data, timeout)
+            status_code = response.status_code if response is not None else None
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+        
+            delay = self.retry_policy.next_delay(method, endpoint, attempt, status_code, retry_after)
+            if delay is None:
+                break
+            logger.warning(f"Retrying InsightVM {method} {endpoint} in {delay:.2f}s (attempt {attempt + 1}, status {status_code or 'transport error'})")
+            time.sleep(delay)
+            attempt += 1
+        
+        if response is None:
+            return error
+        
+        result = self._handle_response(method, endpoint, response)
+        self._update_cache(method, endpoint, url, result, use_cache)
+        return result
+    
+    def _fetch_page(self, method: str, endpoint: str, params: Optional[Dict], data: Optional[Dict],
+                    page: int, page_size: int, use_cache: bool = True) -> Dict:
+        """Fetch a single page, raising InsightVMError on failure"""
+        page_params = dict(params or {})
+        page_params.update({"page": page, "size": page_size})
+        result = self._make_request(method, endpoint, params=page_params, data=data, use_cache=use_cache)
+        if result.get("error"):
+            raise InsightVMError(f"Failed to get page {page} of {endpoint}: {result['error']}")
+        return result
+    
+    def iter_pages(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None,
+                   page_size: int = 500, max_items: Optional[int] = None, concurrency: Optional[int] = None,
+                   start_page: int = 0, use_cache: bool = True) -> Iterator[Dict]:
+        """
+        Yield successive pages of a list endpoint until page.totalPages is exhausted.
+        Once the first page reports totalPages, up to `concurrency` of the remaining
+        pages are fetched in parallel; pages are still yielded in order.
+        start_page skips the pages before it, e.g. to resume an interrupted walk, and
+        use_cache=False reads every page upstream.
+        """
+        max_pages = None
+        if max_items is not None:
+            max_pages = -(-max_items // page_size) if max_items > 0 else 0
+            if max_pages == 0:
+                return
+        
+        first_page = self._fetch_page(method, endpoint, params, data, start_page, page_size, use_cache)
+        yield first_page
+        
+        total_pages = first_page.get("page", {}).get("totalPages")
+        if total_pages is None:
+            # Without paging metadata walk sequentially; a short page is the last one
+            page = start_page
+            result = first_page
+            while len(result.get("resources", [])) >= page_size:
+                page += 1
+                if max_pages is not None and page >= max_pages:
+                    break
+                result = self._fetch_page(method, endpoint, params, data, page, page_size, use_cache)
+                yield result
+            return
+        
+        last_page = total_pages if max_pages is None else min(total_pages, max_pages)
+        workers = min(concurrency or self.page_concurrency, last_page - start_page - 1)
+        if workers <= 1:
+            for page in range(start_page + 1, last_page):
+                yield self._fetch_page(method, endpoint, params, data, page, page_size, use_cache)
+            return
+        
+        # Sliding window keeps at most `workers` pages in flight or buffered
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="insightvm-page") as executor:
+            pending = deque()
+            next_page = start_page + 1
+            try:
+                while next_page < last_page or pending:
+                    while next_page < last_page and len(pending) < workers:
+                        pending.append(executor.submit(self._fetch_page, method, endpoint, params, data, next_page, page_size, use_cache))
+                        next_page += 1
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+    
+    def _iter_resources(self, method: str, endpoint: str, params: Optional[Dict] = None, data: Optional[Dict] = None,
+                        page_size: int = 500, max_items: Optional[int] = None, concurrency: Optional[int] = None,
+                        use_cache: bool = True) -> Iterator[Dict]:
+        """Yield resources one at a time, holding at most the prefetch window of pages in memory"""
+        yielded = 0
+        for page in self.iter_pages(method, endpoint, params=params, data=data, page_size=page_size,
+                                    max_items=max_items, concurrency=concurrency, use_cache=use_cache):
+            for resource in page.get("resources", []):
+                if max_items is not None and yielded >= max_items:
+                    return
+                yield resource
+                yielded += 1
+    
+    def test_connection(self) -> Dict:
+        """Test connectivity to InsightVM API"""
+        try:
+            response = self._make_request("GET", "administration/info")
+            return {
+                "status": "connected",
+                "message": "Successfully connected to InsightVM",
+                "server_info": response
+            }
+        except Exception as e:
+            return {
+                "status": "failed",
+                "message": f"Failed to connect to InsightVM: {str(e)}"
+            }
+    
+    def get_assessed_assets(self, page: int = 0, size: int = 500) -> Dict:
+        """Get assessed assets from InsightVM (assets that have been scanned/assessed)"""
+        try:
+            # First try to get all assets and filter for those with scan dates
+            params = {"page": page, "size": size}
+            assets_response = self._make_request("GET", "assets", params=params)
+            
+            # If the basic assets call fails, try the search method
+            if assets_response.get("error"):
+                logger.warning(f"Basic assets call failed: {assets_response.get('error')}, trying search method")
+                search_data = {
+                    "match": "all",
+                    "filters": [
+                        {
+                            "field": "last-scan-date",
+                            "operator": "is-not-empty"
+                        }
+                    ]
+                }
+                params = {"page": page, "size": size}
+                return self._make_request("POST", "assets/search", params=params, data=search_data)
+            
+            return assets_response
+            
+        except Exception as e:
+            logger.error(f"Failed to get assessed assets: {e}")
+            return {"error": f"Failed to get assessed assets: {str(e)}"}
+
 # Create global instance
 insightvm_client = InsightVMClient()
\ No newline at end of file
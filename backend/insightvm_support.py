@@ -0,0 +1,512 @@
+"""
+Request policies shared by the sync and async InsightVM clients
+"""
+import asyncio
+import copy
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import deque, OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager, asynccontextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from fnmatch import fnmatch
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+from config import settings
+import logging
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - non-POSIX platforms
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for 429, 5xx and transport failures.
+    A server-sent Retry-After is honored up to retry_after_max seconds.
+    Each call may retry up to max_retries times; all calls together may retry at
+    most budget times per budget_window seconds so an outage cannot multiply load.
+    """
+
+    def __init__(self, max_retries: Optional[int] = None, backoff_base: Optional[float] = None,
+                 backoff_max: Optional[float] = None, budget: Optional[int] = None,
+                 budget_window: Optional[float] = None, retry_after_max: Optional[float] = None):
+        self.max_retries = settings.insightvm_max_retries if max_retries is None else max_retries
+        self.backoff_base = settings.insightvm_retry_backoff_base if backoff_base is None else backoff_base
+        self.backoff_max = settings.insightvm_retry_backoff_max if backoff_max is None else backoff_max
+        self.budget = settings.insightvm_retry_budget if budget is None else budget
+        self.budget_window = settings.insightvm_retry_budget_window if budget_window is None else budget_window
+        self.retry_after_max = settings.insightvm_retry_after_max if retry_after_max is None else retry_after_max
+
+        self._lock = threading.Lock()
+        self._recent_retries = deque()
+        self._stats = {
+            "retries": 0,
+            "recovered": 0,
+            "exhausted": 0,
+            "budget_denied": 0,
+            "retry_after_too_long": 0,
+            "by_status": {}
+        }
+
+    @staticmethod
+    def is_idempotent(method: str, endpoint: str) -> bool:
+        """GETs and read-only search POSTs are safe to replay after a server-side failure"""
+        return method.upper() in ("GET", "HEAD", "OPTIONS") or endpoint.rstrip("/").endswith("search")
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay for the given retry attempt (0-based)"""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _prune_budget(self, now: float):
+        while self._recent_retries and now - self._recent_retries[0] > self.budget_window:
+            self._recent_retries.popleft()
+
+    def _acquire_budget(self) -> bool:
+        now = time.monotonic()
+        self._prune_budget(now)
+        if len(self._recent_retries) >= self.budget:
+            return False
+        self._recent_retries.append(now)
+        return True
+
+    def next_delay(self, method: str, endpoint: str, attempt: int, status_code: Optional[int],
+                   retry_after: Optional[str] = None) -> Optional[float]:
+        """
+        Decide whether a finished attempt should be retried.
+        status_code is None for transport failures (timeouts, connection errors).
+        Returns the seconds to wait before the next attempt, or None to stop.
+        """
+        status_key = str(status_code) if status_code is not None else "transport"
+        retryable = status_code is None or status_code in RETRYABLE_STATUS_CODES
+        # A 429 was rejected before processing, so even non-idempotent calls can be replayed
+        if retryable and status_code != 429 and not self.is_idempotent(method, endpoint):
+            retryable = False
+
+        with self._lock:
+            if not retryable:
+                if attempt > 0 and status_code is not None and status_code < 400:
+                    self._stats["recovered"] += 1
+                return None
+
+            if attempt >= self.max_retries:
+                self._stats["exhausted"] += 1
+                return None
+
+            delay = self.backoff(attempt)
+            server_delay = parse_retry_after(retry_after)
+            if server_delay is not None:
+                if server_delay > self.retry_after_max:
+                    self._stats["retry_after_too_long"] += 1
+                    return None
+                delay = server_delay
+
+            if not self._acquire_budget():
+                self._stats["budget_denied"] += 1
+                return None
+
+            self._stats["retries"] += 1
+            self._stats["by_status"][status_key] = self._stats["by_status"].get(status_key, 0) + 1
+            return delay
+
+    def get_stats(self) -> Dict:
+        """Retry counters plus the current policy configuration"""
+        with self._lock:
+            self._prune_budget(time.monotonic())
+            return {
+                **self._stats,
+                "by_status": dict(self._stats["by_status"]),
+                "budget_used": len(self._recent_retries),
+                "max_retries": self.max_retries,
+                "budget": self.budget,
+                "budget_window_seconds": self.budget_window,
+                "retry_after_max_seconds": self.retry_after_max
+            }
+
+
+class RateLimiter:
+    """
+    Token bucket throttling requests per second, plus a cap on in-flight requests.
+    The bucket is shared by every thread and coroutine using this instance; when
+    state_file is set the bucket lives in that file under an exclusive flock so all
+    worker processes on the host draw from the same budget. The in-flight cap is
+    enforced per process.
+    """
+
+    def __init__(self, rate: Optional[float] = None, burst: Optional[int] = None,
+                 max_in_flight: Optional[int] = None, state_file: Optional[str] = None):
+        self.rate = settings.insightvm_rate_limit if rate is None else rate
+        self.burst = settings.insightvm_rate_burst if burst is None else burst
+        self.max_in_flight = settings.insightvm_max_in_flight if max_in_flight is None else max_in_flight
+        self.state_file = settings.insightvm_rate_limit_file if state_file is None else state_file
+
+        if self.state_file and fcntl is None:
+            logger.warning("File-based rate limit coordination needs fcntl; using a per-process bucket")
+            self.state_file = None
+
+        self._lock = threading.Lock()
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._slots = threading.BoundedSemaphore(self.max_in_flight) if self.max_in_flight > 0 else None
+        self._in_flight = 0
+        self._temp_state_file = None
+        self._temp_state_users = 0
+        self._lent_slots = 0
+        self._stats = {
+            "requests": 0,
+            "throttled": 0,
+            "throttle_wait_seconds": 0.0,
+            "peak_in_flight": 0
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    @contextmanager
+    def shared_with(self, processes: int):
+        """
+        Share this limiter's budget with `processes` worker processes for the duration of
+        the block, yielding the RateLimiter arguments each of them should use.
+        The bucket moves into a state file they can open (a temp file when none is
+        configured, removed again afterwards); without flock the rate and burst are split
+        instead. The in-flight cap still held by this process is split between it and the
+        workers, and this process holds back the workers' slots until the block ends.
+        """
+        lent_slots = 0
+        share = 0
+        if self._slots is not None:
+            with self._lock:
+                available = self.max_in_flight - self._lent_slots
+                share = max(1, available // (processes + 1))
+                # Always keep one slot for this process
+                lent_slots = min(share * processes, available - 1)
+                self._lent_slots += lent_slots
+        limits = {"rate": self.rate, "burst": self.burst, "max_in_flight": share, "state_file": ""}
+
+        if self.enabled and fcntl is not None:
+            with self._lock:
+                if not self.state_file:
+                    fd, self._temp_state_file = tempfile.mkstemp(prefix="insightvm_rate_limit_")
+                    os.close(fd)
+                    self.state_file = self._temp_state_file
+                if self._temp_state_file:
+                    self._temp_state_users += 1
+                limits["state_file"] = self.state_file
+        elif self.enabled:
+            limits["rate"] = self.rate / (processes + 1)
+            limits["burst"] = max(1, self.burst // (processes + 1))
+
+        for _ in range(lent_slots):
+            self._slots.acquire()
+        try:
+            yield limits
+        finally:
+            for _ in range(lent_slots):
+                self._slots.release()
+            with self._lock:
+                self._lent_slots -= lent_slots
+                if limits["state_file"] and self._temp_state_file:
+                    self._temp_state_users -= 1
+                    if self._temp_state_users == 0:
+                        self.state_file = None
+                        os.remove(self._temp_state_file)
+                        self._temp_state_file = None
+
+    def _take_token(self, tokens: float, updated: float, now: float):
+        """Refill the bucket, take one token and return (tokens, wait seconds)"""
+        tokens = min(float(self.burst), tokens + (now - updated) * self.rate)
+        tokens -= 1
+        # A negative balance is a reservation: wait until the bucket refills to zero
+        wait = -tokens / self.rate if tokens < 0 else 0.0
+        return tokens, wait
+
+    def _reserve_from_file(self) -> float:
+        fd = os.open(self.state_file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            now = time.time()
+            try:
+                tokens_str, updated_str = os.read(fd, 64).decode().split()
+                tokens, updated = float(tokens_str), float(updated_str)
+            except ValueError:
+                tokens, updated = float(self.burst), now
+            tokens, wait = self._take_token(tokens, updated, now)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            os.write(fd, f"{tokens:.6f} {now:.6f}".encode())
+            return wait
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before sending"""
+        if not self.enabled:
+            return 0.0
+        if self.state_file:
+            wait = self._reserve_from_file()
+        else:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens, wait = self._take_token(self._tokens, self._updated, now)
+                self._updated = now
+        if wait > 0:
+            with self._lock:
+                self._stats["throttled"] += 1
+                self._stats["throttle_wait_seconds"] += wait
+        return wait
+
+    def _enter(self):
+        with self._lock:
+            self._in_flight += 1
+            self._stats["requests"] += 1
+            self._stats["peak_in_flight"] = max(self._stats["peak_in_flight"], self._in_flight)
+
+    def _exit(self):
+        with self._lock:
+            self._in_flight -= 1
+        if self._slots is not None:
+            self._slots.release()
+
+    @contextmanager
+    def slot(self):
+        """Block the calling thread until a request may be sent"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        if self._slots is not None:
+            self._slots.acquire()
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+
+    @asynccontextmanager
+    async def async_slot(self):
+        """Suspend the calling coroutine until a request may be sent"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        if self._slots is not None:
+            # The slots are shared with sync threads, so poll instead of blocking the loop
+            while not self._slots.acquire(blocking=False):
+                await asyncio.sleep(0.01)
+        self._enter()
+        try:
+            yield
+        finally:
+            self._exit()
+
+    def get_stats(self) -> Dict:
+        """Throttling counters plus the current limiter configuration"""
+        with self._lock:
+            return {
+                **self._stats,
+                "throttle_wait_seconds": round(self._stats["throttle_wait_seconds"], 3),
+                "in_flight": self._in_flight,
+                "rate_per_second": self.rate,
+                "burst": self.burst,
+                "max_in_flight": self.max_in_flight,
+                "shared_state_file": self.state_file
+            }
+
+
+def parse_ttl_rules(value: Optional[str]) -> List[Tuple[str, float]]:
+    """Parse "pattern=seconds,pattern=seconds" into ordered (glob pattern, ttl) rules"""
+    rules = []
+    for item in (value or "").split(","):
+        if "=" not in item:
+            continue
+        pattern, ttl = item.rsplit("=", 1)
+        try:
+            rules.append((pattern.strip().strip("/"), float(ttl)))
+        except ValueError:
+            logger.warning(f"Ignoring invalid InsightVM cache TTL rule: {item}")
+    return rules
+
+class ResponseCache:
+    """
+    Size-bounded LRU cache for successful GET responses.
+    TTLs are chosen per endpoint by the first matching glob rule (e.g. "sites/*=300");
+    a rule containing "?" is matched against the endpoint plus its query string
+    (e.g. "sites/*/assets?*size=0=300"). Endpoints matching no rule use default_ttl,
+    and a TTL of 0 disables caching.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, default_ttl: Optional[float] = None,
+                 ttl_rules: Optional[List[Tuple[str, float]]] = None):
+        self.max_entries = settings.insightvm_cache_max_entries if max_entries is None else max_entries
+        self.default_ttl = settings.insightvm_cache_default_ttl if default_ttl is None else default_ttl
+        self.ttl_rules = parse_ttl_rules(settings.insightvm_cache_ttls) if ttl_rules is None else ttl_rules
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def ttl_for(self, endpoint: str, key: str = "") -> float:
+        endpoint = endpoint.strip("/")
+        query = key.partition("?")[2]
+        for pattern, ttl in self.ttl_rules:
+            if fnmatch(f"{endpoint}?{query}" if "?" in pattern else endpoint, pattern):
+                return ttl
+        return self.default_ttl
+
+    def get(self, endpoint: str, key: str) -> Optional[Dict]:
+        """Return a copy of a fresh cached response, or None"""
+        if self.max_entries <= 0 or self.ttl_for(endpoint, key) <= 0:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+        # Callers may mutate results, so never hand out the cached object itself
+        return copy.deepcopy(value)
+
+    def set(self, endpoint: str, key: str, value: Any):
+        """Store a response if its endpoint is cacheable; error results are never cached"""
+        ttl = self.ttl_for(endpoint, key)
+        if self.max_entries <= 0 or ttl <= 0 or not isinstance(value, dict) or value.get("error"):
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, endpoint.strip("/"), copy.deepcopy(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def invalidate(self, pattern: Optional[str] = None) -> int:
+        """Drop entries whose endpoint matches the glob pattern, or everything; returns the count"""
+        with self._lock:
+            if pattern is None:
+                removed = len(self._entries)
+                self._entries.clear()
+            else:
+                pattern = pattern.strip("/")
+                keys = [key for key, (_, endpoint, _) in self._entries.items() if fnmatch(endpoint, pattern)]
+                for key in keys:
+                    del self._entries[key]
+                removed = len(keys)
+            self._stats["invalidations"] += removed
+            return removed
+
+    def get_stats(self) -> Dict:
+        """Cache counters plus the current cache configuration"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                **self._stats,
+                "hit_ratio": round(self._stats["hits"] / lookups, 4) if lookups else 0,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "default_ttl": self.default_ttl,
+                "ttl_rules": [{"pattern": pattern, "ttl": ttl} for pattern, ttl in self.ttl_rules]
+            }
+
+
+class SingleFlight:
+    """
+    Collapse concurrent identical calls from threads into one upstream call.
+    The first caller for a key runs the call; callers arriving while it is in
+    flight wait for it and receive a copy of its result (or its exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = Future()
+                self._calls[key] = call
+                self._stats["executed"] += 1
+                leader = True
+            else:
+                self._stats["coalesced"] += 1
+                leader = False
+
+        if not leader:
+            return copy.deepcopy(call.result())
+
+        try:
+            result = fn()
+            call.set_result(result)
+            return result
+        except BaseException as e:
+            call.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self._stats, "in_flight": len(self._calls)}
+
+class AsyncSingleFlight:
+    """
+    Collapse concurrent identical coroutine calls into one upstream call.
+    The call runs as its own task, so a cancelled caller does not cancel it
+    for the others waiting on the same key.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is not None and not task.done():
+            self._stats["coalesced"] += 1
+            return copy.deepcopy(await asyncio.shield(task))
+
+        task = asyncio.ensure_future(fn())
+        self._calls[key] = task
+        self._stats["executed"] += 1
+        task.add_done_callback(lambda done: self._calls.pop(key, None) if self._calls.get(key) is done else None)
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict:
+        return {**self._stats, "in_flight": len(self._calls)}
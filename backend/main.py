@@ -7,10 +7,17 @@ from typing import List, Optional
 import models
 import schemas
 import crud
-from database import SessionLocal, engine, get_db
-from auth import create_access_token, verify_password, get_current_active_user
+import crud_async
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import (SessionLocal, engine, get_db, get_read_db, get_async_read_db,
+                      get_pool_stats, dispose_async_engine)
+from config import settings
+from auth import create_access_token, verify_password, get_current_active_user, get_current_active_user_async
 from rapid7_client import rapid7_client
 from insightvm_client import insightvm_client
+from insightvm_async_client import insightvm_async_client
+from sync_jobs import sync_job_runner
+from asset_lookup import AssetLookup
 import logging
 import csv
 import io
@@ -55,6 +62,17 @@ create_default_admin()
 
 app = FastAPI(title="Safaricom Asset Inventory API", version="1.0.0")
 
+@app.on_event("startup")
+def recover_sync_jobs():
+    sync_job_runner.recover_interrupted()
+
+@app.on_event("shutdown")
+async def close_insightvm_clients():
+    sync_job_runner.shutdown()
+    insightvm_client.close()
+    await insightvm_async_client.aclose()
+    await dispose_async_engine()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
@@ -89,18 +107,18 @@ def create_team(team: schemas.TeamCreate, db: Session = Depends(get_db), current
 
 @app.get("/teams/", response_model=List[schemas.Team])
 def read_teams(skip: int = 0, limit: int = 100, parent_team_id: Optional[int] = None, 
-               db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+               db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     teams = crud.get_teams(db, skip=skip, limit=limit, parent_team_id=parent_team_id)
     return teams
 
 @app.get("/teams/main/", response_model=List[schemas.Team])
-def read_main_teams(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_main_teams(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     """Get only main teams (no parent teams)"""
     teams = crud.get_main_teams(db, skip=skip, limit=limit)
     return teams
 
 @app.get("/teams/{team_id}/sub-teams/", response_model=List[schemas.Team])
-def read_sub_teams(team_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_sub_teams(team_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     """Get sub-teams for a specific parent team"""
     if not current_user.is_admin and current_user.team_id != team_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -108,7 +126,7 @@ def read_sub_teams(team_id: int, db: Session = Depends(get_db), current_user: mo
     return sub_teams
 
 @app.get("/teams/{team_id}/hierarchy/", response_model=schemas.Team)
-def read_team_hierarchy(team_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_team_hierarchy(team_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     """Get team with all its sub-teams"""
     if not current_user.is_admin and current_user.team_id != team_id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
@@ -167,7 +185,7 @@ def read_users_me(current_user: models.User = Depends(get_current_active_user)):
     return current_user
 
 @app.get("/users/", response_model=List[schemas.User])
-def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Not enough permissions")
     return crud.get_users(db, skip=skip, limit=limit)
@@ -200,121 +218,109 @@ def create_asset(asset: schemas.AssetCreate, db: Session = Depends(get_db), curr
     return crud.create_asset(db=db, asset=asset)
 
 @app.get("/assets/", response_model=List[schemas.Asset])
-def read_assets(skip: int = 0, limit: int = 100, environment: Optional[str] = None, 
-                criticality: Optional[str] = None, db: Session = Depends(get_db), 
-                current_user: models.User = Depends(get_current_active_user)):
+async def read_assets(skip: int = 0, limit: int = 100, environment: Optional[str] = None, 
+                      criticality: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db), 
+                      current_user: models.User = Depends(get_current_active_user_async)):
     team_id = None if current_user.is_admin else current_user.team_id
-    assets = crud.get_assets(db, skip=skip, limit=limit, team_id=team_id, 
-                            environment=environment, criticality=criticality)
+    assets = await crud_async.get_assets(db, skip=skip, limit=limit, team_id=team_id, 
+                                         environment=environment, criticality=criticality)
     return assets
 
 @app.get("/assets/stats/")
-def get_assets_stats(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def get_assets_stats(db: AsyncSession = Depends(get_async_read_db), current_user: models.User = Depends(get_current_active_user_async)):
     """Get asset statistics by environment and criticality"""
     team_id = None if current_user.is_admin else current_user.team_id
-    stats = crud.get_assets_stats(db, team_id)
+    stats = await crud_async.get_assets_stats(db, team_id)
     return stats
 
 @app.get("/assets/critical/", response_model=List[schemas.Asset])
-def read_critical_assets(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_critical_assets(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     """Get all critical assets"""
     team_id = None if current_user.is_admin else current_user.team_id
     assets = crud.get_critical_assets(db, team_id)
     return assets
 
 @app.get("/assets/prod/", response_model=List[schemas.Asset])
-def read_prod_assets(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_prod_assets(db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     """Get all production assets"""
     team_id = None if current_user.is_admin else current_user.team_id
     assets = crud.get_prod_assets(db, team_id)
     return assets
 
 @app.get("/assets/environment/{environment}/", response_model=List[schemas.Asset])
-def read_assets_by_environment(environment: str, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_assets_by_environment(environment: str, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     """Get assets by environment (dev, uat, prod)"""
     team_id = None if current_user.is_admin else current_user.team_id
     assets = crud.get_assets_by_environment(db, environment, team_id)
     return assets
 
 @app.get("/assets/criticality/{criticality}/", response_model=List[schemas.Asset])
-def read_assets_by_criticality(criticality: str, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_assets_by_criticality(criticality: str, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     """Get assets by criticality level"""
     team_id = None if current_user.is_admin else current_user.team_id
     assets = crud.get_assets_by_criticality(db, criticality, team_id)
     return assets
 
 @app.get("/assets/grouped-by-team")
-def get_assets_grouped_by_team(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
-    """Get assets grouped by team for admin dashboard"""
+def get_assets_grouped_by_team(
+    include_assets: bool = True,
+    assets_limit: Optional[int] = None,
+    assets_offset: int = 0,
+    db: Session = Depends(get_read_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """
+    Get assets grouped by team for admin dashboard.
+    Team counts and review buckets come from one aggregate query and the asset lists
+    from one more (skipped with include_assets=false); assets_limit / assets_offset
+    page each team's asset list.
+    """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
+    if (assets_limit is not None and assets_limit < 0) or assets_offset < 0:
+        raise HTTPException(status_code=400, detail="assets_limit and assets_offset must not be negative")
     
-    from sqlalchemy import func
+    summaries = crud.get_team_asset_summaries(db, datetime.now())
     
-    # Get all teams with their asset counts and details
-    teams_with_assets = db.query(models.Team).all()
+    assets_by_team = {}
+    if include_assets:
+        for row in crud.get_team_asset_rows(db, limit_per_team=assets_limit, offset_per_team=assets_offset):
+            assets_by_team.setdefault(row.team_id, []).append({
+                "id": row.id,
+                "name": row.name,
+                "ip_address": row.ip_address,
+                "public_facing": row.public_facing,
+                "last_reviewed_date": row.last_reviewed_date,
+                "owner_name": row.owner_name
+            })
     
     result = []
     total_assets = 0
     
-    for team in teams_with_assets:
-        team_assets = db.query(models.Asset).filter(models.Asset.team_id == team.id).all()
-        
-        # Calculate team statistics
-        public_facing_count = len([a for a in team_assets if a.public_facing])
-        private_count = len([a for a in team_assets if not a.public_facing])
-        
-        # Review status counts
-        never_reviewed = len([a for a in team_assets if not a.last_reviewed_date])
-        overdue_count = 0
-        warning_count = 0
-        current_count = 0
-        
-        cutoff_date_60 = datetime.now() - pd.Timedelta(days=60)
-        cutoff_date_45 = datetime.now() - pd.Timedelta(days=45)
-        
-        for asset in team_assets:
-            if asset.last_reviewed_date:
-                days_since = (datetime.now() - asset.last_reviewed_date).days
-                if days_since > 60:
-                    overdue_count += 1
-                elif days_since > 45:
-                    warning_count += 1
-                else:
-                    current_count += 1
-        
+    for team in summaries:
         team_data = {
             "team_id": team.id,
             "team_name": team.name,
             "team_description": team.description,
-            "total_assets": len(team_assets),
-            "public_facing_assets": public_facing_count,
-            "private_assets": private_count,
+            "total_assets": team.total,
+            "public_facing_assets": team.public_facing,
+            "private_assets": team.total - team.public_facing,
             "review_status": {
-                "current": current_count,
-                "warning": warning_count, 
-                "overdue": overdue_count,
-                "never_reviewed": never_reviewed
+                "current": team.current,
+                "warning": team.warning,
+                "overdue": team.overdue,
+                "never_reviewed": team.never_reviewed
             },
-            "compliance_rate": round(((current_count + warning_count) / len(team_assets) * 100) if team_assets else 100, 2),
-            "assets": [
-                {
-                    "id": asset.id,
-                    "name": asset.name,
-                    "ip_address": asset.ip_address,
-                    "public_facing": asset.public_facing,
-                    "last_reviewed_date": asset.last_reviewed_date,
-                    "owner_name": asset.owner.full_name if asset.owner else "Unassigned"
-                }
-                for asset in team_assets
-            ]
+            "compliance_rate": round(((team.current + team.warning) / team.total * 100) if team.total else 100, 2)
         }
+        if include_assets:
+            team_data["assets"] = assets_by_team.get(team.id, [])
         
         result.append(team_data)
-        total_assets += len(team_assets)
+        total_assets += team.total
     
     return {
-        "total_teams": len(teams_with_assets),
+        "total_teams": len(summaries),
         "total_assets": total_assets,
         "teams": result
     }
@@ -358,7 +364,7 @@ def create_service(asset_id: int, service: schemas.ServiceBase, db: Session = De
     return crud.create_service(db=db, service=service_create)
 
 @app.get("/assets/{asset_id}/services/", response_model=List[schemas.Service])
-def read_asset_services(asset_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_asset_services(asset_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     asset = crud.get_asset(db, asset_id=asset_id)
     if asset is None:
         raise HTTPException(status_code=404, detail="Asset not found")
@@ -367,7 +373,7 @@ def read_asset_services(asset_id: int, db: Session = Depends(get_db), current_us
     return crud.get_services_by_asset(db, asset_id=asset_id)
 
 @app.get("/assets/{asset_id}/vulnerabilities/", response_model=List[schemas.Vulnerability])
-def read_asset_vulnerabilities(asset_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+def read_asset_vulnerabilities(asset_id: int, db: Session = Depends(get_read_db), current_user: models.User = Depends(get_current_active_user)):
     asset = crud.get_asset(db, asset_id=asset_id)
     if asset is None:
         raise HTTPException(status_code=404, detail="Asset not found")
@@ -402,10 +408,12 @@ def start_asset_scan(asset_id: int, db: Session = Depends(get_db), current_user:
         raise HTTPException(status_code=500, detail="Failed to start scan")
 
 @app.get("/vulnerabilities/team/{team_id}", response_model=List[schemas.Vulnerability])
-def read_team_vulnerabilities(team_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_active_user)):
+async def read_team_vulnerabilities(team_id: int, status: Optional[str] = None, db: AsyncSession = Depends(get_async_read_db),
+                                    current_user: models.User = Depends(get_current_active_user_async)):
+    """Findings of a team's assets; pass status=open for live findings only (resolved ones are kept as history)"""
     if not current_user.is_admin and current_user.team_id != team_id:
         raise HTTPException(status_code=403, detail="Access denied")
-    return crud.get_vulnerabilities_by_team(db, team_id=team_id)
+    return await crud_async.get_vulnerabilities_by_team(db, team_id=team_id, status=status)
 
 @app.get("/assets/download-template")
 def download_assets_template(current_user: models.User = Depends(get_current_active_user)):
@@ -441,7 +449,7 @@ def export_assets(
     review_status: Optional[str] = None,  # 'current', 'warning', 'overdue', 'never'
     include_services: bool = False,
     include_vulnerabilities: bool = False,
-    db: Session = Depends(get_db), 
+    db: Session = Depends(get_read_db), 
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Export assets to CSV with filters"""
@@ -514,9 +522,10 @@ def export_assets(
             else:
                 review_status_text = "Current"
         
-        # Get services and vulnerabilities count
+        # Get services and vulnerabilities count; resolved findings are kept for history only
         services_count = len(asset.services) if asset.services else 0
-        vulnerabilities_count = len(asset.vulnerabilities) if asset.vulnerabilities else 0
+        open_vulns = [v for v in asset.vulnerabilities or [] if v.status == "open"]
+        vulnerabilities_count = len(open_vulns)
         
         row_data = {
             "Asset ID": asset.id,
@@ -546,9 +555,9 @@ def export_assets(
             row_data["Services"] = "No services detected"
             row_data["Service Ports"] = ""
         
-        if include_vulnerabilities and asset.vulnerabilities:
-            critical_vulns = len([v for v in asset.vulnerabilities if v.severity.lower() == 'critical'])
-            high_vulns = len([v for v in asset.vulnerabilities if v.severity.lower() == 'high'])
+        if include_vulnerabilities and open_vulns:
+            critical_vulns = len([v for v in open_vulns if v.severity.lower() == 'critical'])
+            high_vulns = len([v for v in open_vulns if v.severity.lower() == 'high'])
             row_data["Critical Vulnerabilities"] = critical_vulns
             row_data["High Vulnerabilities"] = high_vulns
             row_data["Total Vulnerabilities"] = vulnerabilities_count
@@ -610,6 +619,10 @@ def upload_assets(
         created_assets = []
         errors = []
         
+        # Existing IPs and team ids are checked in memory rather than with two queries per row
+        asset_lookup = AssetLookup.load(db)
+        team_ids = {team_id for (team_id,) in db.query(models.Team.id)}
+        
         for index, row in df.iterrows():
             try:
                 # Convert public_facing to boolean
@@ -628,18 +641,17 @@ def upload_assets(
                 )
                 
                 # Check if team exists
-                team = db.query(models.Team).filter(models.Team.id == asset_data.team_id).first()
-                if not team:
+                if asset_data.team_id not in team_ids:
                     errors.append(f"Row {index + 2}: Team with ID {asset_data.team_id} not found")
                     continue
                 
                 # Check if asset with same IP already exists
-                existing_asset = db.query(models.Asset).filter(models.Asset.ip_address == asset_data.ip_address).first()
-                if existing_asset:
+                if asset_data.ip_address in asset_lookup:
                     errors.append(f"Row {index + 2}: Asset with IP {asset_data.ip_address} already exists")
                     continue
                 
                 created_asset = crud.create_asset(db=db, asset=asset_data)
+                asset_lookup.add(created_asset.ip_address, created_asset.id, created_asset.team_id)
                 created_assets.append(created_asset)
                 
             except Exception as e:
@@ -659,13 +671,13 @@ def upload_assets(
         file.file.close()
 
 @app.get("/insightvm/test-connection")
-def test_insightvm_connection(current_user: models.User = Depends(get_current_active_user)):
+async def test_insightvm_connection(current_user: models.User = Depends(get_current_active_user)):
     """Test connectivity to InsightVM API"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
     try:
-        result = insightvm_client.test_connection()
+        result = await insightvm_async_client.test_connection()
         return result
     except Exception as e:
         logger.error(f"Failed to test InsightVM connection: {e}")
@@ -674,22 +686,69 @@ def test_insightvm_connection(current_user: models.User = Depends(get_current_ac
             "message": f"Failed to connect to InsightVM: {str(e)}"
         }
 
+@app.get("/insightvm/metrics")
+def get_insightvm_client_metrics(current_user: models.User = Depends(get_current_active_user)):
+    """Get InsightVM client connection, retry, rate limiter, cache and coalescing metrics"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    
+    return {
+        "connections": {
+            "sync": insightvm_client.get_connection_stats(),
+            "async": insightvm_async_client.get_connection_stats()
+        },
+        # The clients share one retry policy and rate limiter, so both report the same counters
+        "retries": {
+            "sync": insightvm_client.get_retry_stats(),
+            "async": insightvm_async_client.get_retry_stats()
+        },
+        "rate_limiter": {
+            "sync": insightvm_client.get_rate_limit_stats(),
+            "async": insightvm_async_client.get_rate_limit_stats()
+        },
+        "cache": insightvm_client.get_cache_stats(),
+        "single_flight": {
+            "sync": insightvm_client.get_single_flight_stats(),
+            "async": insightvm_async_client.get_single_flight_stats()
+        }
+    }
+
+@app.get("/database/metrics")
+def get_database_metrics(current_user: models.User = Depends(get_current_active_user)):
+    """Get database connection pool occupancy and checkout wait metrics"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    
+    return get_pool_stats()
+
+@app.post("/insightvm/cache/invalidate")
+def invalidate_insightvm_cache(
+    endpoint: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Drop cached InsightVM responses for an endpoint glob (e.g. "sites/*"), or all of them"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    
+    removed = insightvm_client.invalidate_cache(endpoint)
+    return {"message": "InsightVM cache invalidated", "endpoint": endpoint, "removed": removed}
+
 @app.get("/insightvm/assets/")
-def get_insightvm_assets(
+async def get_insightvm_assets(
     page: int = 0, 
     size: int = 100,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get assets from InsightVM"""
     try:
-        assets = insightvm_client.get_assets(page=page, size=size)
+        assets = await insightvm_async_client.get_assets(page=page, size=size)
         return assets
     except Exception as e:
         logger.error(f"Failed to get InsightVM assets: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve assets: {str(e)}")
 
 @app.post("/insightvm/assets/search")
-def search_insightvm_assets(
+async def search_insightvm_assets(
     query: str,
     page: int = 0,
     size: int = 100,
@@ -697,41 +756,41 @@ def search_insightvm_assets(
 ):
     """Search assets in InsightVM"""
     try:
-        results = insightvm_client.search_assets(query=query, page=page, size=size)
+        results = await insightvm_async_client.search_assets(query=query, page=page, size=size)
         return results
     except Exception as e:
         logger.error(f"Failed to search InsightVM assets: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to search assets: {str(e)}")
 
-@app.get("/insightvm/assets/{asset_id}")
-def get_insightvm_asset(
+@app.get("/insightvm/assets/{asset_id:int}")
+async def get_insightvm_asset(
     asset_id: int,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get specific asset from InsightVM"""
     try:
-        asset = insightvm_client.get_asset(asset_id)
+        asset = await insightvm_async_client.get_asset(asset_id)
         return asset
     except Exception as e:
         logger.error(f"Failed to get InsightVM asset {asset_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve asset: {str(e)}")
 
 @app.get("/insightvm/sites/")
-def get_insightvm_sites(
+async def get_insightvm_sites(
     page: int = 0,
     size: int = 100,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get sites from InsightVM"""
     try:
-        sites = insightvm_client.get_sites(page=page, size=size)
+        sites = await insightvm_async_client.get_sites(page=page, size=size)
         return sites
     except Exception as e:
         logger.error(f"Failed to get InsightVM sites: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve sites: {str(e)}")
 
 @app.get("/insightvm/vulnerabilities/")
-def get_insightvm_vulnerabilities(
+async def get_insightvm_vulnerabilities(
     page: int = 0,
     size: int = 100,
     severity: Optional[str] = None,
@@ -739,28 +798,28 @@ def get_insightvm_vulnerabilities(
 ):
     """Get vulnerabilities from InsightVM"""
     try:
-        vulns = insightvm_client.get_vulnerabilities(page=page, size=size, severity=severity)
+        vulns = await insightvm_async_client.get_vulnerabilities(page=page, size=size, severity=severity)
         return vulns
     except Exception as e:
         logger.error(f"Failed to get InsightVM vulnerabilities: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve vulnerabilities: {str(e)}")
 
 @app.get("/insightvm/vulnerabilities/exploitable")
-def get_insightvm_exploitable_vulnerabilities(
+async def get_insightvm_exploitable_vulnerabilities(
     page: int = 0,
     size: int = 100,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get exploitable vulnerabilities from InsightVM"""
     try:
-        vulns = insightvm_client.get_exploitable_vulnerabilities(page=page, size=size)
+        vulns = await insightvm_async_client.get_exploitable_vulnerabilities(page=page, size=size)
         return vulns
     except Exception as e:
         logger.error(f"Failed to get exploitable vulnerabilities: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to retrieve exploitable vulnerabilities: {str(e)}")
 
 @app.post("/insightvm/scans/site/{site_id}")
-def start_insightvm_site_scan(
+async def start_insightvm_site_scan(
     site_id: int,
     scan_name: Optional[str] = None,
     current_user: models.User = Depends(get_current_active_user)
@@ -770,14 +829,14 @@ def start_insightvm_site_scan(
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
     try:
-        result = insightvm_client.start_site_scan(site_id, scan_name)
+        result = await insightvm_async_client.start_site_scan(site_id, scan_name)
         return {"message": "Site scan started successfully", "scan_data": result}
     except Exception as e:
         logger.error(f"Failed to start site scan: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to start site scan: {str(e)}")
 
 @app.get("/insightvm/scans/")
-def get_insightvm_scans(
+async def get_insightvm_scans(
     page: int = 0,
     size: int = 100,
     active: Optional[bool] = None,
@@ -785,7 +844,7 @@ def get_insightvm_scans(
 ):
     """Get scans from InsightVM"""
     try:
-        scans = insightvm_client.get_scans(page=page, size=size, active=active)
+        scans = await insightvm_async_client.get_scans(page=page, size=size, active=active)
         return scans
     except Exception as e:
         logger.error(f"Failed to get InsightVM scans: {e}")
@@ -1063,7 +1122,7 @@ def mark_asset_reviewed(
 @app.get("/assets/overdue-reviews")
 def get_overdue_assets(
     days_threshold: int = 60,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get assets that haven't been reviewed in specified days"""
@@ -1103,7 +1162,7 @@ def get_overdue_assets(
 @app.get("/teams/review-compliance")
 def get_team_review_compliance(
     days_threshold: int = 60,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get team compliance status for asset reviews"""
@@ -1166,47 +1225,44 @@ def get_team_review_compliance(
 
 # Dashboard Data Aggregation
 @app.get("/insightvm/dashboard/stats")
-def get_insightvm_dashboard_stats(current_user: models.User = Depends(get_current_active_user)):
-    """Get aggregated dashboard statistics from InsightVM"""
+async def get_insightvm_dashboard_stats(current_user: models.User = Depends(get_current_active_user)):
+    """
+    Get aggregated dashboard statistics from InsightVM.
+    The count calls run concurrently; a failed or timed out call leaves its
+    field as null and is reported under "errors" keyed by field path.
+    """
     try:
-        # Get vulnerability statistics
-        vuln_stats = insightvm_client.get_vulnerabilities(size=0)  # Get just counts
-        critical_vulns = insightvm_client.search_vulnerabilities_by_severity("critical", size=0)
-        high_vulns = insightvm_client.search_vulnerabilities_by_severity("high", size=0)
-        exploitable_vulns = insightvm_client.get_exploitable_vulnerabilities(size=0)
-        
-        # Get site statistics
-        sites_data = insightvm_client.get_sites(size=0)
-        
-        # Get asset statistics
-        assets_data = insightvm_client.get_assets(size=0)
-        
-        # Get scan statistics
-        scans_data = insightvm_client.get_scans(size=0, active=True)
+        # Each count is a size=0 call, so only page.totalResources is used
+        results = await insightvm_async_client.gather({
+            "vulnerabilities.total": insightvm_async_client.get_vulnerabilities(size=0),
+            "vulnerabilities.critical": insightvm_async_client.search_vulnerabilities_by_severity("critical", size=0),
+            "vulnerabilities.high": insightvm_async_client.search_vulnerabilities_by_severity("high", size=0),
+            "vulnerabilities.exploitable": insightvm_async_client.get_exploitable_vulnerabilities(size=0),
+            "sites.total": insightvm_async_client.get_sites(size=0),
+            "assets.total": insightvm_async_client.get_assets(size=0),
+            "scans.active": insightvm_async_client.get_scans(size=0, active=True)
+        })
+        
+        stats = {"vulnerabilities": {}, "sites": {}, "assets": {}, "scans": {}}
+        errors = {}
+        for field, result in results.items():
+            group, name = field.split(".")
+            if result.get("error"):
+                stats[group][name] = None
+                errors[field] = result["error"]
+            else:
+                stats[group][name] = result.get("page", {}).get("totalResources", 0)
         
-        return {
-            "vulnerabilities": {
-                "total": vuln_stats.get("page", {}).get("totalResources", 0),
-                "critical": critical_vulns.get("page", {}).get("totalResources", 0),
-                "high": high_vulns.get("page", {}).get("totalResources", 0),
-                "exploitable": exploitable_vulns.get("page", {}).get("totalResources", 0)
-            },
-            "sites": {
-                "total": sites_data.get("page", {}).get("totalResources", 0)
-            },
-            "assets": {
-                "total": assets_data.get("page", {}).get("totalResources", 0)
-            },
-            "scans": {
-                "active": scans_data.get("page", {}).get("totalResources", 0)
-            }
-        }
+        stats["errors"] = errors
+        if len(errors) == len(results):
+            stats["error"] = "All InsightVM dashboard calls failed"
+        return stats
     except Exception as e:
         logger.error(f"Failed to get InsightVM dashboard stats: {e}")
         return {"error": str(e)}
 
 @app.get("/insightvm/vulnerabilities/summary")
-def get_vulnerabilities_summary(
+async def get_vulnerabilities_summary(
     page: int = 0, 
     size: int = 100,
     severity: Optional[str] = None,
@@ -1218,9 +1274,9 @@ def get_vulnerabilities_summary(
         size = min(size, 500)
         
         if severity:
-            result = insightvm_client.search_vulnerabilities_by_severity(severity, page, size)
+            result = await insightvm_async_client.search_vulnerabilities_by_severity(severity, page, size)
         else:
-            result = insightvm_client.get_vulnerabilities(page, size)
+            result = await insightvm_async_client.get_vulnerabilities(page, size)
         
         # Check if result contains error
         if isinstance(result, dict) and result.get("error"):
@@ -1271,27 +1327,22 @@ def get_vulnerabilities_summary(
         }
 
 @app.get("/insightvm/sites/overview")
-def get_sites_overview(
+async def get_sites_overview(
     page: int = 0, 
     size: int = 100,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get sites overview with vulnerability and scan statistics"""
     try:
-        sites_result = insightvm_client.get_sites(page, size)
+        sites_result = await insightvm_async_client.get_sites(page, size)
+        
+        # Asset counts for the whole page in one pass instead of one call per site
+        assets_counts = await insightvm_async_client.get_site_asset_counts(sites_result.get("resources", []))
         
         sites_overview = []
         for site in sites_result.get("resources", []):
             site_id = site.get("id")
-            
-            # Get site assets count
-            assets_count = 0
-            if site_id:
-                try:
-                    assets_result = insightvm_client.get_site_assets(site_id, size=0)
-                    assets_count = assets_result.get("page", {}).get("totalResources", 0)
-                except:
-                    pass
+            assets_count = assets_counts.get(site_id, 0)
             
             site_data = {
                 "id": site_id,
@@ -1324,7 +1375,7 @@ def get_sites_overview(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/insightvm/assets/vulnerabilities")
-def get_assets_with_vulnerabilities(
+async def get_assets_with_vulnerabilities(
     page: int = 0, 
     size: int = 100,
     severity_filter: Optional[str] = None,
@@ -1335,7 +1386,7 @@ def get_assets_with_vulnerabilities(
         # Limit size to prevent 422 errors
         size = min(size, 100)
         
-        assets_result = insightvm_client.get_assets(page, size)
+        assets_result = await insightvm_async_client.get_assets(page, size)
         
         # Check if result contains error
         if isinstance(assets_result, dict) and assets_result.get("error"):
@@ -1350,40 +1401,44 @@ def get_assets_with_vulnerabilities(
         assets_with_vulns = []
         resources = assets_result.get("resources", []) if assets_result else []
         
-        for asset in resources:
+        # Fetch vulnerabilities for the whole page concurrently; gather keeps page order
+        # and turns a failed or timed out asset into an error result
+        vulns_results = await insightvm_async_client.gather({
+            index: insightvm_async_client.get_asset_vulnerabilities(asset.get("id"), size=50)
+            for index, asset in enumerate(resources) if asset.get("id")
+        })
+        
+        for index, asset in enumerate(resources):
             try:
                 asset_id = asset.get("id")
                 
-                # Get asset vulnerabilities
+                # Failed assets degrade to an empty summary
                 vulns_summary = {"critical": 0, "high": 0, "medium": 0, "low": 0, "total": 0}
                 recent_vulns = []
                 
-                if asset_id:
-                    try:
-                        vulns_result = insightvm_client.get_asset_vulnerabilities(asset_id, size=50)
+                vulns_result = vulns_results.get(index)
+                if vulns_result and vulns_result.get("error"):
+                    logger.error(f"Failed to get vulnerabilities for asset {asset_id}: {vulns_result['error']}")
+                elif vulns_result:
+                    for vuln in vulns_result.get("resources", []):
+                        severity = vuln.get("severity", "").lower()
+                        if severity == "critical":
+                            vulns_summary["critical"] += 1
+                        elif severity in ["severe", "high"]:
+                            vulns_summary["high"] += 1
+                        elif severity in ["moderate", "medium"]:
+                            vulns_summary["medium"] += 1
+                        elif severity == "low":
+                            vulns_summary["low"] += 1
+                        vulns_summary["total"] += 1
                         
-                        if vulns_result and not vulns_result.get("error"):
-                            for vuln in vulns_result.get("resources", []):
-                                severity = vuln.get("severity", "").lower()
-                                if severity == "critical":
-                                    vulns_summary["critical"] += 1
-                                elif severity in ["severe", "high"]:
-                                    vulns_summary["high"] += 1
-                                elif severity in ["moderate", "medium"]:
-                                    vulns_summary["medium"] += 1
-                                elif severity == "low":
-                                    vulns_summary["low"] += 1
-                                vulns_summary["total"] += 1
-                                
-                                if len(recent_vulns) < 5:
-                                    recent_vulns.append({
-                                        "id": vuln.get("id"),
-                                        "title": vuln.get("title", "Unknown Vulnerability"),
-                                        "severity": vuln.get("severity", "Unknown"),
-                                        "cvss_score": vuln.get("cvss", {}).get("v3", {}).get("score", 0)
-                                    })
-                    except Exception as e:
-                        logger.error(f"Failed to get vulnerabilities for asset {asset_id}: {e}")
+                        if len(recent_vulns) < 5:
+                            recent_vulns.append({
+                                "id": vuln.get("id"),
+                                "title": vuln.get("title", "Unknown Vulnerability"),
+                                "severity": vuln.get("severity", "Unknown"),
+                                "cvss_score": vuln.get("cvss", {}).get("v3", {}).get("score", 0)
+                            })
                 
                 # Skip assets with no vulnerabilities if severity filter is applied
                 if severity_filter and vulns_summary["total"] == 0:
@@ -1429,7 +1484,7 @@ def get_assets_with_vulnerabilities(
         }
 
 @app.get("/insightvm/assets/assessed")
-def get_assessed_assets_from_insightvm(
+async def get_assessed_assets_from_insightvm(
     page: int = 0, 
     size: int = 100,
     current_user: models.User = Depends(get_current_active_user)
@@ -1442,7 +1497,7 @@ def get_assessed_assets_from_insightvm(
         logger.info(f"Fetching assessed assets from InsightVM: page={page}, size={size}")
         
         # First test the connection
-        connection_test = insightvm_client.test_connection()
+        connection_test = await insightvm_async_client.test_connection()
         if connection_test.get("status") != "connected":
             logger.error(f"InsightVM connection failed: {connection_test}")
             return {
@@ -1452,7 +1507,7 @@ def get_assessed_assets_from_insightvm(
                 "totalResources": 0
             }
         
-        assessed_assets_result = insightvm_client.get_assessed_assets(page, size)
+        assessed_assets_result = await insightvm_async_client.get_assessed_assets(page, size)
         logger.info(f"InsightVM assessed assets response: {type(assessed_assets_result)}")
         
         # Check if result contains error
@@ -1561,19 +1616,19 @@ def get_assessed_assets_from_insightvm(
         }
 
 @app.get("/insightvm/test-assessed-assets")
-def test_assessed_assets_endpoint(current_user: models.User = Depends(get_current_active_user)):
+async def test_assessed_assets_endpoint(current_user: models.User = Depends(get_current_active_user)):
     """Test endpoint to debug assessed assets functionality"""
     try:
         # Test connection first
-        connection_test = insightvm_client.test_connection()
+        connection_test = await insightvm_async_client.test_connection()
         if connection_test.get("status") != "connected":
             return {"error": "InsightVM connection failed", "details": connection_test}
         
         # Test basic assets call
-        basic_assets = insightvm_client.get_assets(0, 10)
+        basic_assets = await insightvm_async_client.get_assets(0, 10)
         
         # Test assessed assets call
-        assessed_assets = insightvm_client.get_assessed_assets(0, 10)
+        assessed_assets = await insightvm_async_client.get_assessed_assets(0, 10)
         
         return {
             "connection": connection_test,
@@ -1590,7 +1645,7 @@ def test_assessed_assets_endpoint(current_user: models.User = Depends(get_curren
         return {"error": f"Test failed: {str(e)}"}
 
 @app.get("/insightvm/reports")
-def get_insightvm_reports(
+async def get_insightvm_reports(
     page: int = 0,
     size: int = 100,
     current_user: models.User = Depends(get_current_active_user)
@@ -1600,7 +1655,7 @@ def get_insightvm_reports(
         size = min(size, 500)
         
         # Test connection first
-        connection_test = insightvm_client.test_connection()
+        connection_test = await insightvm_async_client.test_connection()
         if connection_test.get("status") != "connected":
             return {
                 "error": f"InsightVM connection failed: {connection_test.get('message', 'Unknown error')}",
@@ -1608,7 +1663,7 @@ def get_insightvm_reports(
                 "page": {"number": page, "size": size, "totalResources": 0}
             }
         
-        reports_result = insightvm_client.get_reports(page, size)
+        reports_result = await insightvm_async_client.get_reports(page, size)
         
         if reports_result.get("error"):
             return {
@@ -1645,7 +1700,7 @@ def get_insightvm_reports(
         }
 
 @app.get("/insightvm/reports/{report_id}/history")
-def get_insightvm_report_history(
+async def get_insightvm_report_history(
     report_id: int,
     page: int = 0,
     size: int = 100,
@@ -1655,7 +1710,7 @@ def get_insightvm_report_history(
     try:
         size = min(size, 500)
         
-        history_result = insightvm_client.get_report_instances(report_id, page, size)
+        history_result = await insightvm_async_client.get_report_instances(report_id, page, size)
         
         if history_result.get("error"):
             return {
@@ -1692,7 +1747,7 @@ def get_insightvm_report_history(
         }
 
 @app.post("/insightvm/reports/{report_id}/generate")
-def generate_insightvm_report(
+async def generate_insightvm_report(
     report_id: int,
     request_data: dict,
     current_user: models.User = Depends(get_current_active_user)
@@ -1705,7 +1760,7 @@ def generate_insightvm_report(
         report_name = request_data.get("name")
         report_format = request_data.get("format", "pdf")
         
-        result = insightvm_client.generate_report(report_id, report_name, report_format)
+        result = await insightvm_async_client.generate_report(report_id, report_name, report_format)
         
         if result.get("error"):
             return {"error": result["error"]}
@@ -1721,7 +1776,7 @@ def generate_insightvm_report(
         return {"error": f"Failed to generate report: {str(e)}"}
 
 @app.get("/insightvm/reports/{report_id}/templates")
-def get_insightvm_report_templates(
+async def get_insightvm_report_templates(
     page: int = 0,
     size: int = 100,
     current_user: models.User = Depends(get_current_active_user)
@@ -1730,7 +1785,7 @@ def get_insightvm_report_templates(
     try:
         size = min(size, 500)
         
-        templates_result = insightvm_client.get_report_templates(page, size)
+        templates_result = await insightvm_async_client.get_report_templates(page, size)
         
         if templates_result.get("error"):
             return {
@@ -1765,19 +1820,19 @@ def get_insightvm_report_templates(
         }
 
 @app.get("/insightvm/vulnerability-trends")
-def get_vulnerability_trends(
+async def get_vulnerability_trends(
     days: int = 30,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get vulnerability trends over time"""
     try:
         # Get vulnerabilities by severity
-        critical_vulns = insightvm_client.search_vulnerabilities_by_severity("critical", size=1000)
-        high_vulns = insightvm_client.search_vulnerabilities_by_severity("severe", size=1000)
-        medium_vulns = insightvm_client.search_vulnerabilities_by_severity("moderate", size=1000)
+        critical_vulns = await insightvm_async_client.search_vulnerabilities_by_severity("critical", size=1000)
+        high_vulns = await insightvm_async_client.search_vulnerabilities_by_severity("severe", size=1000)
+        medium_vulns = await insightvm_async_client.search_vulnerabilities_by_severity("moderate", size=1000)
         
         # Get exploitable vulnerabilities
-        exploitable_vulns = insightvm_client.get_exploitable_vulnerabilities(size=1000)
+        exploitable_vulns = await insightvm_async_client.get_exploitable_vulnerabilities(size=1000)
         
         # Calculate trend data (simplified - in production you'd want historical data)
         trends = {
@@ -1823,7 +1878,7 @@ def get_vulnerability_trends(
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.post("/insightvm/sites/{site_id}/scan")
-def start_site_scan(
+async def start_site_scan(
     site_id: int,
     scan_name: Optional[str] = None,
     current_user: models.User = Depends(get_current_active_user)
@@ -1833,17 +1888,17 @@ def start_site_scan(
         if not current_user.is_admin:
             raise HTTPException(status_code=403, detail="Admin privileges required to start scans")
         
-        result = insightvm_client.start_site_scan(site_id, scan_name)
+        result = await insightvm_async_client.start_site_scan(site_id, scan_name)
         return result
     except Exception as e:
         logger.error(f"Failed to start site scan: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/insightvm/scans/active")
-def get_active_scans(current_user: models.User = Depends(get_current_active_user)):
+async def get_active_scans(current_user: models.User = Depends(get_current_active_user)):
     """Get currently active scans"""
     try:
-        result = insightvm_client.get_scans(active=True, size=100)
+        result = await insightvm_async_client.get_scans(active=True, size=100)
         
         active_scans = []
         for scan in result.get("resources", []):
@@ -1870,11 +1925,11 @@ def get_active_scans(current_user: models.User = Depends(get_current_active_user
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/insightvm/reports/available")
-def get_available_reports(current_user: models.User = Depends(get_current_active_user)):
+async def get_available_reports(current_user: models.User = Depends(get_current_active_user)):
     """Get available report templates"""
     try:
-        templates = insightvm_client.get_report_templates()
-        reports = insightvm_client.get_reports()
+        templates = await insightvm_async_client.get_report_templates()
+        reports = await insightvm_async_client.get_reports()
         
         return {
             "templates": templates.get("resources", []),
@@ -1884,228 +1939,119 @@ def get_available_reports(current_user: models.User = Depends(get_current_active
         logger.error(f"Failed to get available reports: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/insightvm/sync/vulnerabilities")
+@app.post("/insightvm/sync/vulnerabilities", response_model=schemas.SyncJob, status_code=status.HTTP_202_ACCEPTED)
 def sync_insightvm_vulnerabilities(
     asset_ip: Optional[str] = None,
     sync_all: bool = False,
+    incremental: bool = False,
+    shards: Optional[int] = None,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Sync vulnerability data from InsightVM to local database"""
+    """
+    Queue a background job syncing vulnerability data from InsightVM to the local database.
+    With incremental=true only assets rescanned since their last sync are fetched.
+    With sync_all, shards > 1 splits the assets across that many worker processes
+    (default INSIGHTVM_SYNC_SHARDS).
+    """
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
-    try:
-        synced_count = 0
-        error_count = 0
-        errors = []
-        
-        # First test the connection
-        connection_test = insightvm_client.test_connection()
-        if connection_test.get("status") != "connected":
-            raise HTTPException(status_code=503, detail=f"InsightVM connection failed: {connection_test.get('message', 'Unknown error')}")
-        
-        if sync_all:
-            # Get all assets from InsightVM
-            assets_response = insightvm_client.get_assets(size=1000)
-            if assets_response.get("error"):
-                raise HTTPException(status_code=502, detail=f"Failed to get assets from InsightVM: {assets_response.get('error')}")
-            assets = assets_response.get("resources", [])
-        elif asset_ip:
-            # Search for specific asset by IP
-            search_response = insightvm_client.search_assets_by_ip(asset_ip)
-            if search_response.get("error"):
-                raise HTTPException(status_code=502, detail=f"Failed to search assets by IP: {search_response.get('error')}")
-            assets = search_response.get("resources", [])
-        else:
-            raise HTTPException(status_code=400, detail="Either asset_ip or sync_all must be provided")
-        
-        for asset in assets:
-            try:
-                asset_id = asset.get("id")
-                asset_ip_addr = asset.get("ip")
-                
-                if not asset_id or not asset_ip_addr:
-                    continue
-                
-                # Find matching local asset
-                local_asset = db.query(models.Asset).filter(
-                    models.Asset.ip_address == asset_ip_addr
-                ).first()
-                
-                if not local_asset:
-                    # Create asset if it doesn't exist
-                    default_team = db.query(models.Team).first()
-                    if not default_team:
-                        continue
-                    
-                    local_asset = models.Asset(
-                        name=asset.get("hostName", f"Asset_{asset_ip_addr}"),
-                        ip_address=asset_ip_addr,
-                        os_version=asset.get("os", "Unknown"),
-                        public_facing=False,
-                        team_id=default_team.id,
-                        owner_id=current_user.id
-                    )
-                    db.add(local_asset)
-                    db.commit()
-                    db.refresh(local_asset)
-                
-                # Get vulnerabilities for this asset
-                vulns_response = insightvm_client.get_asset_vulnerabilities(asset_id, size=1000)
-                if vulns_response.get("error"):
-                    error_count += 1
-                    errors.append(f"Failed to get vulnerabilities for asset {asset_ip_addr}: {vulns_response.get('error')}")
-                    continue
-                vulnerabilities = vulns_response.get("resources", [])
-                
-                for vuln in vulnerabilities:
-                    try:
-                        vuln_id = vuln.get("id")
-                        if not vuln_id:
-                            continue
-                        
-                        # Check if vulnerability already exists
-                        existing_vuln = db.query(models.Vulnerability).filter(
-                            models.Vulnerability.asset_id == local_asset.id,
-                            models.Vulnerability.rapid7_vuln_id == vuln_id
-                        ).first()
-                        
-                        if not existing_vuln:
-                            # Create new vulnerability
-                            new_vuln = models.Vulnerability(
-                                asset_id=local_asset.id,
-                                rapid7_vuln_id=vuln_id,
-                                title=vuln.get("title", "Unknown Vulnerability"),
-                                description=vuln.get("description", {}).get("text", "")[:1000],
-                                severity=vuln.get("severity", "Unknown").lower(),
-                                cvss_score=str(vuln.get("cvss", {}).get("v3", {}).get("score", 0)),
-                                status="open",
-                                discovered_date=datetime.now(),
-                                last_seen=datetime.now()
-                            )
-                            db.add(new_vuln)
-                            synced_count += 1
-                        else:
-                            # Update existing vulnerability
-                            existing_vuln.title = vuln.get("title", existing_vuln.title)
-                            existing_vuln.description = vuln.get("description", {}).get("text", existing_vuln.description)[:1000]
-                            existing_vuln.severity = vuln.get("severity", existing_vuln.severity).lower()
-                            existing_vuln.cvss_score = str(vuln.get("cvss", {}).get("v3", {}).get("score", 0))
-                            existing_vuln.last_seen = datetime.now()
-                            synced_count += 1
-                    
-                    except Exception as e:
-                        error_count += 1
-                        errors.append(f"Error syncing vulnerability {vuln.get('id', 'unknown')}: {str(e)}")
-                        logger.error(f"Error syncing vulnerability: {e}")
-                
-                db.commit()
-                
-            except Exception as e:
-                error_count += 1
-                errors.append(f"Error syncing asset {asset.get('ip', 'unknown')}: {str(e)}")
-                logger.error(f"Error syncing asset: {e}")
-        
-        return {
-            "message": f"Vulnerability sync completed",
-            "synced_count": synced_count,
-            "error_count": error_count,
-            "errors": errors[:10]  # Limit to first 10 errors
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to sync InsightVM vulnerabilities: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    if not asset_ip and not sync_all:
+        raise HTTPException(status_code=400, detail="Either asset_ip or sync_all must be provided")
+    
+    if shards is None:
+        shards = settings.insightvm_sync_shards
+    if shards < 1:
+        raise HTTPException(status_code=400, detail="shards must be at least 1")
+    
+    params = {"asset_ip": asset_ip, "sync_all": sync_all, "incremental": incremental, "shards": shards}
+    return sync_job_runner.submit(db, "vulnerabilities", params, current_user.id)
 
-@app.post("/insightvm/sync/assets")
+@app.post("/insightvm/sync/assets", response_model=schemas.SyncJob, status_code=status.HTTP_202_ACCEPTED)
 def sync_insightvm_assets(
     site_id: Optional[int] = None,
     sync_all: bool = False,
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_active_user)
 ):
-    """Sync asset data from InsightVM to local database"""
+    """Queue a background job syncing asset data from InsightVM to the local database"""
     if not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Admin privileges required")
     
+    if not site_id and not sync_all:
+        raise HTTPException(status_code=400, detail="Either site_id or sync_all must be provided")
+    
+    return sync_job_runner.submit(db, "assets", {"site_id": site_id, "sync_all": sync_all}, current_user.id)
+
+@app.post("/insightvm/sync/retention", response_model=schemas.SyncJob, status_code=status.HTTP_202_ACCEPTED)
+def archive_resolved_vulnerabilities(
+    older_than_days: Optional[int] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Queue a background job moving long-resolved vulnerabilities to the history table"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    
+    if older_than_days is not None and older_than_days < 0:
+        raise HTTPException(status_code=400, detail="older_than_days must not be negative")
+    
+    return sync_job_runner.submit(db, "retention", {"older_than_days": older_than_days}, current_user.id)
+
+@app.get("/insightvm/sync/jobs", response_model=List[schemas.SyncJob])
+def get_sync_jobs(
+    skip: int = 0,
+    limit: int = 50,
+    job_type: Optional[str] = None,
+    job_status: Optional[str] = None,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """List InsightVM sync jobs, newest first"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    return crud.get_sync_jobs(db, skip=skip, limit=limit, job_type=job_type, status=job_status)
+
+@app.get("/insightvm/sync/jobs/{job_id}", response_model=schemas.SyncJob)
+def get_sync_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Get status and progress of an InsightVM sync job"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+    job = crud.get_sync_job(db, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
+
+@app.post("/insightvm/sync/jobs/{job_id}/resume", response_model=schemas.SyncJob, status_code=status.HTTP_202_ACCEPTED)
+def resume_sync_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    current_user: models.User = Depends(get_current_active_user)
+):
+    """Resume an interrupted or failed sync job from its last checkpoint"""
+    if not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
     try:
-        synced_count = 0
-        error_count = 0
-        errors = []
-        
-        if sync_all:
-            # Get all assets from InsightVM
-            assets_response = insightvm_client.get_assets(size=1000)
-            assets = assets_response.get("resources", [])
-        elif site_id:
-            # Get assets for specific site
-            assets_response = insightvm_client.get_site_assets(site_id, size=1000)
-            assets = assets_response.get("resources", [])
-        else:
-            raise HTTPException(status_code=400, detail="Either site_id or sync_all must be provided")
-        
-        # Get default team for unassigned assets
-        default_team = db.query(models.Team).first()
-        if not default_team:
-            raise HTTPException(status_code=500, detail="No default team found")
-        
-        for asset in assets:
-            try:
-                asset_ip = asset.get("ip")
-                if not asset_ip:
-                    continue
-                
-                # Check if asset already exists
-                existing_asset = db.query(models.Asset).filter(
-                    models.Asset.ip_address == asset_ip
-                ).first()
-                
-                if not existing_asset:
-                    # Create new asset
-                    new_asset = models.Asset(
-                        name=asset.get("hostName", f"Asset_{asset_ip}"),
-                        ip_address=asset_ip,
-                        os_version=asset.get("os", "Unknown"),
-                        public_facing=False,  # Default to false, can be updated manually
-                        team_id=default_team.id,
-                        owner_id=current_user.id
-                    )
-                    db.add(new_asset)
-                    synced_count += 1
-                else:
-                    # Update existing asset
-                    existing_asset.name = asset.get("hostName", existing_asset.name)
-                    existing_asset.os_version = asset.get("os", existing_asset.os_version)
-                    existing_asset.updated_at = datetime.now()
-                    synced_count += 1
-                
-                db.commit()
-                
-            except Exception as e:
-                error_count += 1
-                errors.append(f"Error syncing asset {asset.get('ip', 'unknown')}: {str(e)}")
-                logger.error(f"Error syncing asset: {e}")
-        
-        return {
-            "message": f"Asset sync completed",
-            "synced_count": synced_count,
-            "error_count": error_count,
-            "errors": errors[:10]  # Limit to first 10 errors
-        }
-        
-    except Exception as e:
-        logger.error(f"Failed to sync InsightVM assets: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+        job = sync_job_runner.resume(db, job_id)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Sync job not found")
+    return job
 
 @app.get("/insightvm/assets/{asset_id}/vulnerabilities")
-def get_insightvm_asset_vulnerabilities(
+async def get_insightvm_asset_vulnerabilities(
     asset_id: int,
     current_user: models.User = Depends(get_current_active_user)
 ):
     """Get vulnerabilities for a specific InsightVM asset"""
     try:
-        vulnerabilities = insightvm_client.get_asset_vulnerabilities(asset_id, size=1000)
+        vulnerabilities = await insightvm_async_client.get_asset_vulnerabilities(asset_id, size=1000)
         
         # Process and enrich vulnerability data
         processed_vulns = []
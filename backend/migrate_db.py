@@ -42,7 +42,29 @@ def migrate_database():
             "ALTER TABLE assets ADD COLUMN IF NOT EXISTS business_impact VARCHAR(50);",
             "ALTER TABLE assets ADD COLUMN IF NOT EXISTS asset_type VARCHAR(50);",
             "ALTER TABLE assets ADD COLUMN IF NOT EXISTS location VARCHAR(100);",
-            "ALTER TABLE assets ADD COLUMN IF NOT EXISTS compliance_requirements TEXT;"
+            "ALTER TABLE assets ADD COLUMN IF NOT EXISTS compliance_requirements TEXT;",
+            "ALTER TABLE assets ADD COLUMN IF NOT EXISTS insightvm_last_scan_id VARCHAR(50);",
+            "ALTER TABLE assets ADD COLUMN IF NOT EXISTS insightvm_last_scan_date TIMESTAMP WITH TIME ZONE;",
+            "ALTER TABLE assets ADD COLUMN IF NOT EXISTS insightvm_synced_at TIMESTAMP WITH TIME ZONE;"
+        ]
+        
+        # Unique (asset_id, rapid7_vuln_id) for the sync upsert; duplicates keep their oldest row
+        vulnerabilities_migrations = [
+            """DELETE FROM vulnerabilities a USING vulnerabilities b
+               WHERE a.asset_id = b.asset_id AND a.rapid7_vuln_id = b.rapid7_vuln_id AND a.id > b.id;""",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_vulnerabilities_asset_vuln ON vulnerabilities (asset_id, rapid7_vuln_id);",
+            "ALTER TABLE vulnerabilities ADD COLUMN IF NOT EXISTS resolved_date TIMESTAMP WITH TIME ZONE;",
+            "ALTER TABLE vulnerabilities ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64);"
+        ]
+        
+        # Add columns to sync_jobs table if they don't exist (the table itself is created by the app)
+        sync_jobs_migrations = [
+            "ALTER TABLE IF EXISTS sync_jobs ADD COLUMN IF NOT EXISTS assets_skipped INTEGER DEFAULT 0 NOT NULL;",
+            "ALTER TABLE IF EXISTS sync_jobs ADD COLUMN IF NOT EXISTS vulns_resolved INTEGER DEFAULT 0 NOT NULL;",
+            "ALTER TABLE IF EXISTS sync_jobs ADD COLUMN IF NOT EXISTS vulns_archived INTEGER DEFAULT 0 NOT NULL;",
+            "ALTER TABLE IF EXISTS sync_jobs ADD COLUMN IF NOT EXISTS definitions_fetched INTEGER DEFAULT 0 NOT NULL;",
+            "ALTER TABLE IF EXISTS sync_jobs ADD COLUMN IF NOT EXISTS resume_cursor TEXT;",
+            "ALTER TABLE IF EXISTS sync_jobs ADD COLUMN IF NOT EXISTS resume_count INTEGER DEFAULT 0 NOT NULL;"
         ]
         
         # Execute teams migrations
@@ -63,6 +85,24 @@ def migrate_database():
             except Exception as e:
                 print(f"✗ {migration} - {e}")
         
+        # Execute vulnerabilities migrations
+        print("Migrating vulnerabilities table...")
+        for migration in vulnerabilities_migrations:
+            try:
+                cursor.execute(migration)
+                print(f"✓ {migration}")
+            except Exception as e:
+                print(f"✗ {migration} - {e}")
+        
+        # Execute sync_jobs migrations
+        print("Migrating sync_jobs table...")
+        for migration in sync_jobs_migrations:
+            try:
+                cursor.execute(migration)
+                print(f"✓ {migration}")
+            except Exception as e:
+                print(f"✗ {migration} - {e}")
+        
         # Commit changes
         conn.commit()
         print("✓ Database migration completed successfully!")
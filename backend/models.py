@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Boolean, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -59,6 +59,11 @@ class Asset(Base):
     location = Column(String(100))  # Physical or logical location
     compliance_requirements = Column(Text)  # JSON array of compliance requirements
     
+    # InsightVM sync watermark: the scan whose vulnerabilities were last pulled for this asset
+    insightvm_last_scan_id = Column(String(50))
+    insightvm_last_scan_date = Column(DateTime(timezone=True))
+    insightvm_synced_at = Column(DateTime(timezone=True))
+    
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -83,6 +88,10 @@ class Service(Base):
 
 class Vulnerability(Base):
     __tablename__ = "vulnerabilities"
+    __table_args__ = (
+        # One row per InsightVM finding per asset; the target of the sync upsert
+        UniqueConstraint("asset_id", "rapid7_vuln_id", name="uq_vulnerabilities_asset_vuln"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     asset_id = Column(Integer, ForeignKey("assets.id"), nullable=False)
@@ -91,12 +100,58 @@ class Vulnerability(Base):
     description = Column(Text)
     severity = Column(String(20), nullable=False)
     cvss_score = Column(String(10))
-    status = Column(String(20), default="open")
+    content_hash = Column(String(64))  # sha256 of the synced fields; the sync rewrites the row only when it changes
+    status = Column(String(20), default="open")  # open, resolved (no longer reported by InsightVM)
     discovered_date = Column(DateTime(timezone=True))
     last_seen = Column(DateTime(timezone=True))
+    resolved_date = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     asset = relationship("Asset", back_populates="vulnerabilities")
+    
+    # Shared InsightVM definition; synced findings keep only title/severity and leave description to it.
+    # No FK because manually created findings need not match a catalog entry.
+    definition = relationship(
+        "VulnerabilityDefinition",
+        primaryjoin="foreign(Vulnerability.rapid7_vuln_id) == VulnerabilityDefinition.rapid7_vuln_id",
+        viewonly=True,
+        lazy="selectin"
+    )
+
+class VulnerabilityDefinition(Base):
+    """InsightVM vulnerability catalog, one row per rapid7_vuln_id shared by all findings"""
+    __tablename__ = "vulnerability_definitions"
+    
+    rapid7_vuln_id = Column(String(100), primary_key=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text)
+    severity = Column(String(20))
+    cvss_score = Column(String(10))
+    cvss_vector = Column(String(100))
+    categories = Column(Text)  # JSON array of category names
+    cves = Column(Text)  # JSON array of CVE ids
+    published = Column(DateTime(timezone=True))
+    modified = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class VulnerabilityHistory(Base):
+    """Resolved vulnerabilities moved out of the vulnerabilities table by the retention job"""
+    __tablename__ = "vulnerability_history"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)  # id the row had in vulnerabilities
+    asset_id = Column(Integer, nullable=False, index=True)
+    rapid7_vuln_id = Column(String(100), index=True)
+    title = Column(String(255), nullable=False)
+    description = Column(Text)
+    severity = Column(String(20), nullable=False)
+    cvss_score = Column(String(10))
+    status = Column(String(20))
+    discovered_date = Column(DateTime(timezone=True))
+    last_seen = Column(DateTime(timezone=True))
+    resolved_date = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
 
 class Scan(Base):
     __tablename__ = "scans"
@@ -112,4 +167,38 @@ class Scan(Base):
     results = Column(Text)
     
     asset = relationship("Asset", back_populates="scans")
-    user = relationship("User")
\ No newline at end of file
+    user = relationship("User")
+
+class SyncJob(Base):
+    __tablename__ = "sync_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_type = Column(String(30), nullable=False, index=True)  # vulnerabilities, assets, retention
+    status = Column(String(20), default="pending", nullable=False, index=True)  # pending, running, completed, failed, interrupted
+    params = Column(Text)  # JSON object of the submitted sync parameters
+    requested_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    worker = Column(String(100))  # host:pid:boot of the process running the job
+    
+    # Progress counters, flushed after every asset
+    assets_total = Column(Integer)
+    assets_done = Column(Integer, default=0, nullable=False)
+    assets_upserted = Column(Integer, default=0, nullable=False)
+    assets_skipped = Column(Integer, default=0, nullable=False)  # unchanged since last sync (incremental mode)
+    vulns_upserted = Column(Integer, default=0, nullable=False)
+    vulns_resolved = Column(Integer, default=0, nullable=False)
+    vulns_archived = Column(Integer, default=0, nullable=False)
+    definitions_fetched = Column(Integer, default=0, nullable=False)
+    error_count = Column(Integer, default=0, nullable=False)
+    errors = Column(Text)  # JSON array of the first error messages
+    message = Column(Text)
+    
+    # Resume point, committed with each asset's data: JSON {"page", "index", "page_size"} of the next asset
+    resume_cursor = Column(Text)
+    resume_count = Column(Integer, default=0, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True))
+    heartbeat_at = Column(DateTime(timezone=True))
+    finished_at = Column(DateTime(timezone=True))
+    
+    user = relationship("User")
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Optional, List, Dict, Any
 from datetime import datetime
+import json
 
 class TeamBase(BaseModel):
     name: str
@@ -123,12 +124,45 @@ class VulnerabilityBase(BaseModel):
 class VulnerabilityCreate(VulnerabilityBase):
     asset_id: int
 
+class VulnerabilityDefinition(BaseModel):
+    rapid7_vuln_id: str
+    title: str
+    description: Optional[str] = None
+    severity: Optional[str] = None
+    cvss_score: Optional[str] = None
+    cvss_vector: Optional[str] = None
+    categories: List[str] = []
+    cves: List[str] = []
+    published: Optional[datetime] = None
+    modified: Optional[datetime] = None
+    
+    @field_validator("categories", "cves", mode="before")
+    @classmethod
+    def parse_json_list(cls, value):
+        """categories and cves are stored as JSON text columns"""
+        if value is None:
+            return []
+        return json.loads(value) if isinstance(value, str) else value
+    
+    class Config:
+        from_attributes = True
+
 class Vulnerability(VulnerabilityBase):
     id: int
     asset_id: int
     discovered_date: Optional[datetime] = None
     last_seen: Optional[datetime] = None
+    resolved_date: Optional[datetime] = None
     created_at: datetime
+    # Read for the description fallback only; each finding would otherwise repeat the catalog entry
+    definition: Optional[VulnerabilityDefinition] = Field(None, exclude=True)
+    
+    @model_validator(mode="after")
+    def default_description(self):
+        """Synced findings keep their description on the shared definition only"""
+        if self.description is None and self.definition is not None:
+            self.description = self.definition.description
+        return self
     
     class Config:
         from_attributes = True
@@ -152,6 +186,42 @@ class Scan(ScanBase):
     class Config:
         from_attributes = True
 
+class SyncJob(BaseModel):
+    id: int
+    job_type: str
+    status: str
+    params: Dict[str, Any] = {}
+    requested_by: int
+    worker: Optional[str] = None
+    assets_total: Optional[int] = None
+    assets_done: int = 0
+    assets_upserted: int = 0
+    assets_skipped: int = 0
+    vulns_upserted: int = 0
+    vulns_resolved: int = 0
+    vulns_archived: int = 0
+    definitions_fetched: int = 0
+    error_count: int = 0
+    errors: List[str] = []
+    message: Optional[str] = None
+    resume_cursor: Optional[Dict[str, Any]] = None
+    resume_count: int = 0
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    
+    @field_validator("params", "errors", "resume_cursor", mode="before")
+    @classmethod
+    def parse_json_text(cls, value, info):
+        """params, errors and resume_cursor are stored as JSON text columns"""
+        if value is None:
+            return {"params": {}, "errors": []}.get(info.field_name)
+        return json.loads(value) if isinstance(value, str) else value
+    
+    class Config:
+        from_attributes = True
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -0,0 +1,859 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import logging
+import uuid
+import zlib
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import nullcontext
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+import models
+import crud
+from config import settings
+from database import SessionLocal
+from insightvm_client import insightvm_client, InsightVMError
+from insightvm_support import RateLimiter
+from asset_lookup import AssetLookup
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("pending", "running")
+RESUMABLE_STATUSES = ("interrupted", "failed")
+
+# Job counters a shard worker reports back for the coordinator to add up
+SHARD_COUNTERS = ("assets_done", "assets_upserted", "assets_skipped", "vulns_upserted",
+                  "vulns_resolved", "definitions_fetched", "error_count")
+
+# Seconds between heartbeats while a sharded coordinator waits on its worker processes
+SHARD_HEARTBEAT_INTERVAL = 30
+
+# Page size for asset walks; stored in the resume cursor so a resumed walk pages the same way
+SYNC_PAGE_SIZE = 500
+
+# Only the first errors are kept on the job row; error_count keeps the full tally
+MAX_STORED_ERRORS = 100
+
+
+class SyncJobError(Exception):
+    """A sync job could not run at all (bad parameters, InsightVM unreachable, ...)"""
+    pass
+
+
+class SyncJobInterrupted(Exception):
+    """The worker is shutting down; the job stops at its last checkpoint"""
+    pass
+
+
+class SyncJobLost(Exception):
+    """Another process took the job over (it was recovered as interrupted); stop without writing"""
+    pass
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Treat naive datetimes (e.g. from SQLite) as UTC so they compare with aware ones"""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _parse_datetime(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return _as_utc(datetime.fromisoformat(str(value).replace("Z", "+00:00")))
+    except ValueError:
+        return None
+
+
+def scan_watermark(asset: Dict) -> Tuple[Optional[str], Optional[datetime]]:
+    """Return (scan id, scan date) of the latest scan InsightVM reports for an asset resource"""
+    scan_id = asset.get("lastScanId")
+    scan_date = asset.get("lastScanDate") or asset.get("lastScanTime")
+    if scan_id is None and scan_date is None:
+        # Fall back to the newest SCAN event in the asset's history
+        scans = [event for event in asset.get("history", []) if event.get("type") == "SCAN"]
+        if scans:
+            latest = max(scans, key=lambda event: event.get("date") or "")
+            scan_id, scan_date = latest.get("scanId"), latest.get("date")
+    return (str(scan_id) if scan_id is not None else None), _parse_datetime(scan_date)
+
+
+def load_scan_watermarks(db: Session) -> Dict[int, Tuple[Optional[str], Optional[datetime]]]:
+    """Return {asset id: (last scan id, last scan date)} for every asset synced before, in one query"""
+    rows = db.query(
+        models.Asset.id, models.Asset.insightvm_last_scan_id, models.Asset.insightvm_last_scan_date
+    ).filter(models.Asset.insightvm_synced_at.isnot(None)).all()
+    return {asset_id: (scan_id, _as_utc(scan_date)) for asset_id, scan_id, scan_date in rows}
+
+
+def scan_unchanged(stored: Optional[Tuple[Optional[str], Optional[datetime]]],
+                   scan_id: Optional[str], scan_date: Optional[datetime]) -> bool:
+    """True if the asset has not been rescanned since its vulnerabilities were last pulled"""
+    if stored is None:
+        # Never synced, so there is nothing to compare against
+        return False
+    stored_scan_id, stored_scan_date = stored
+    if scan_id is not None:
+        return stored_scan_id == scan_id
+    if scan_date is not None and stored_scan_date is not None:
+        return scan_date <= stored_scan_date
+    return False
+
+
+class SyncJobContext:
+    """Progress tracking for one running job, flushed to its SyncJob row"""
+
+    def __init__(self, db: Session, job: models.SyncJob, stop_event: Optional[threading.Event] = None):
+        self.db = db
+        self.job = job
+        self.stop_event = stop_event or threading.Event()
+        self.params = json.loads(job.params or "{}")
+        self.errors = json.loads(job.errors or "[]")
+        self.cursor = json.loads(job.resume_cursor or "{}")
+
+    def error(self, message: str):
+        """Record a per-item failure without stopping the job"""
+        logger.error(f"Sync job {self.job.id}: {message}")
+        self.job.error_count = (self.job.error_count or 0) + 1
+        if len(self.errors) < MAX_STORED_ERRORS:
+            self.errors.append(message)
+
+    def heartbeat(self):
+        """
+        Stamp heartbeat_at if this worker still owns the running job, in the current
+        transaction. The conditional UPDATE locks the row until commit, so progress is
+        never written over a job another process has recovered and resumed.
+        """
+        now = _utcnow()
+        owned = self.db.query(models.SyncJob).filter(
+            models.SyncJob.id == self.job.id,
+            models.SyncJob.status == "running",
+            models.SyncJob.worker == self.job.worker
+        ).update({"heartbeat_at": now}, synchronize_session=False)
+        if not owned:
+            self.db.rollback()
+            raise SyncJobLost(f"Sync job {self.job.id} is no longer owned by worker {self.job.worker}")
+        set_committed_value(self.job, "heartbeat_at", now)
+
+    def checkpoint(self):
+        """Commit pending sync work together with the job's progress counters and resume cursor"""
+        self.job.errors = json.dumps(self.errors)
+        self.job.resume_cursor = json.dumps(self.cursor) if self.cursor else None
+        self.heartbeat()
+        self.db.commit()
+        if self.stop_event.is_set():
+            raise SyncJobInterrupted("Worker shut down before the job finished")
+
+    def merge(self, result: Dict):
+        """Add the counters and errors a shard worker reported to the job"""
+        for counter, value in result["counters"].items():
+            setattr(self.job, counter, (getattr(self.job, counter) or 0) + value)
+        self.errors.extend(result["errors"][:max(MAX_STORED_ERRORS - len(self.errors), 0)])
+
+    def _walk_pages(self, endpoint: str) -> Iterator[Tuple[int, List[Dict], int]]:
+        """
+        Yield (page number, resources, page size) from the saved cursor onwards, taking
+        assets_total from the first page. Assets are sorted by id so cursor positions
+        stay stable while new assets are appended at the end. Pages always come from
+        the console, never the response cache, so a sync applies current data.
+        """
+        page_size = self.cursor.get("page_size", SYNC_PAGE_SIZE)
+        start_page = self.cursor.get("page", 0)
+        pages = insightvm_client.iter_pages("GET", endpoint, params={"sort": "id,ASC"},
+                                            page_size=page_size, start_page=start_page, use_cache=False)
+        for number, page in enumerate(pages, start_page):
+            if self.job.assets_total is None:
+                self.job.assets_total = page.get("page", {}).get("totalResources")
+                self.checkpoint()
+            yield number, page.get("resources", []), page_size
+
+    def iter_assets(self, endpoint: str) -> Iterator[Dict]:
+        """
+        Stream assets page by page. A resumed job starts at the page and position of its
+        saved cursor, which moves past each asset as it is handed out.
+        """
+        for number, resources, page_size in self._walk_pages(endpoint):
+            yield from self._resume_page(resources, number, page_size)
+
+    def iter_asset_pages(self, endpoint: str) -> Iterator[List[Dict]]:
+        """Like iter_assets, but yield the remaining assets of each page together"""
+        for number, resources, page_size in self._walk_pages(endpoint):
+            yield list(self._resume_page(resources, number, page_size))
+
+    def iter_resources(self, resources: List[Dict]) -> Iterator[Dict]:
+        """Walk an already fetched list with the same resume cursor as iter_assets"""
+        yield from self._resume_page(resources, 0, len(resources))
+
+    def _resume_page(self, resources: List[Dict], number: int, page_size: int) -> Iterator[Dict]:
+        """
+        Yield the resources of one page not yet done, pointing the cursor past each one
+        as it is handed out; the next checkpoint commits it with that asset's data.
+        """
+        start = self.cursor.get("index", 0) if self.cursor.get("page", 0) == number else 0
+        for index in range(start, len(resources)):
+            if index + 1 < len(resources):
+                self.cursor = {"page": number, "index": index + 1, "page_size": page_size}
+            else:
+                self.cursor = {"page": number + 1, "index": 0, "page_size": page_size}
+            yield resources[index]
+
+
+def definition_row(vuln: Dict) -> Dict:
+    """Map an InsightVM vulnerabilities/{id} resource to a vulnerability_definitions row"""
+    cvss = vuln.get("cvss", {})
+    cvss_details = cvss.get("v3") or cvss.get("v2") or {}
+    # Categories and CVEs come back as plain strings or as objects depending on the endpoint
+    categories = [category.get("name") if isinstance(category, dict) else category for category in vuln.get("categories", [])]
+    cves = [cve.get("id") if isinstance(cve, dict) else cve for cve in vuln.get("cves", [])]
+    return {
+        "rapid7_vuln_id": str(vuln["id"]),
+        "title": (vuln.get("title") or "Unknown Vulnerability")[:255],
+        "description": (vuln.get("description") or {}).get("text"),
+        "severity": (vuln.get("severity") or "Unknown").lower(),
+        "cvss_score": str(cvss_details.get("score", 0)),
+        "cvss_vector": cvss_details.get("vector"),
+        "categories": json.dumps(categories),
+        "cves": json.dumps(cves),
+        "published": _parse_datetime(vuln.get("published")),
+        "modified": _parse_datetime(vuln.get("modified"))
+    }
+
+
+def fetch_definitions(ctx: SyncJobContext, vuln_ids: Iterable[str], definitions: Dict[str, Tuple]):
+    """
+    Fetch catalog entries InsightVM has not been asked for before, concurrently,
+    store them, and add them to the in-memory `definitions` map.
+    """
+    vuln_ids = list(vuln_ids)
+    with ThreadPoolExecutor(max_workers=insightvm_client.fanout_concurrency) as pool:
+        results = list(pool.map(insightvm_client.get_vulnerability, vuln_ids))
+
+    rows = []
+    for vuln_id, result in zip(vuln_ids, results):
+        if result.get("error"):
+            ctx.error(f"Failed to get vulnerability definition {vuln_id}: {result['error']}")
+            continue
+        rows.append(definition_row({**result, "id": vuln_id}))
+
+    ctx.job.definitions_fetched += crud.upsert_vulnerability_definitions(ctx.db, rows)
+    for row in rows:
+        definitions[row["rapid7_vuln_id"]] = (row["title"], row["severity"], row["cvss_score"])
+
+
+def vulnerability_row(asset_id: int, finding: Dict, definition: Optional[Tuple], now: datetime) -> Dict:
+    """
+    Map an InsightVM asset finding to a vulnerabilities table row. Title, severity and
+    CVSS come from the catalog definition; the description stays in the catalog only.
+    """
+    title, severity, cvss_score = definition or (
+        finding.get("title", "Unknown Vulnerability"),
+        finding.get("severity", "Unknown").lower(),
+        str(finding.get("cvss", {}).get("v3", {}).get("score", 0))
+    )
+    # Hash exactly the fields the upsert rewrites, so an unchanged finding is left alone
+    content_hash = hashlib.sha256(json.dumps([title, None, severity, cvss_score]).encode()).hexdigest()
+    return {
+        "asset_id": asset_id,
+        "rapid7_vuln_id": str(finding["id"]),
+        "title": title,
+        "description": None,
+        "severity": severity,
+        "cvss_score": cvss_score,
+        "content_hash": content_hash,
+        "status": "open",
+        "discovered_date": now,
+        "last_seen": now
+    }
+
+
+class VulnerabilitySyncState:
+    """
+    Lookups shared by every asset of a vulnerability sync, loaded once per run
+    (or once per worker process in sharded mode).
+    """
+
+    def __init__(self, db: Session, incremental: bool, ip_addresses: Optional[Iterable[str]] = None,
+                 shared: bool = False, definitions_lock=None):
+        # Match incoming assets to local ones from memory instead of a query per asset
+        self.lookup = AssetLookup.load(db, ip_addresses=ip_addresses)
+        self.watermarks = load_scan_watermarks(db) if incremental else {}
+        self.definitions = crud.get_vulnerability_definition_refs(db)
+        default_team = db.query(models.Team).first()
+        self.default_team_id = default_team.id if default_team else None
+        self.incremental = incremental
+        # Other processes add assets too, so a miss is checked against the database before creating one
+        self.shared = shared
+        # Held by shard workers while they look up and fetch missing definitions, so each is fetched once
+        self.definitions_lock = definitions_lock or nullcontext()
+
+
+def sync_asset_vulnerabilities(ctx: SyncJobContext, asset: Dict, state: VulnerabilitySyncState):
+    """Store the current findings of one InsightVM asset, creating the local asset if needed"""
+    db = ctx.db
+    job = ctx.job
+    asset_id = asset.get("id")
+    asset_ip_addr = asset.get("ip")
+
+    if not asset_id or not asset_ip_addr:
+        return
+
+    # Find matching local asset
+    local_asset = state.lookup.get(asset_ip_addr)
+    if not local_asset and state.shared:
+        local_asset = state.lookup.refresh(db, asset_ip_addr)
+
+    if not local_asset:
+        # Create asset if it doesn't exist
+        if not state.default_team_id:
+            return
+
+        new_asset = models.Asset(
+            name=asset.get("hostName", f"Asset_{asset_ip_addr}"),
+            ip_address=asset_ip_addr,
+            os_version=asset.get("os", "Unknown"),
+            public_facing=False,
+            team_id=state.default_team_id,
+            owner_id=job.requested_by
+        )
+        db.add(new_asset)
+        db.flush()
+        new_asset_id = new_asset.id
+        db.commit()
+        state.lookup.add(asset_ip_addr, new_asset_id, state.default_team_id)
+        local_asset = state.lookup.get(asset_ip_addr)
+        job.assets_upserted += 1
+
+    scan_id, scan_date = scan_watermark(asset)
+    if state.incremental and scan_unchanged(state.watermarks.get(local_asset.id), scan_id, scan_date):
+        job.assets_skipped += 1
+        return
+    errors_before = job.error_count
+
+    # Get all vulnerabilities for this asset
+    try:
+        vulnerabilities = list(insightvm_client.iter_asset_vulnerabilities(asset_id, use_cache=False))
+    except InsightVMError as e:
+        ctx.error(f"Failed to get vulnerabilities for asset {asset_ip_addr}: {e}")
+        return
+
+    # Each definition is fetched once per catalog, not once per asset
+    missing = {str(vuln["id"]) for vuln in vulnerabilities if vuln.get("id")} - state.definitions.keys()
+    if missing:
+        with state.definitions_lock:
+            if state.shared:
+                # Another worker may have stored them since this one loaded the catalog
+                state.definitions.update(crud.get_vulnerability_definition_refs(db, list(missing)))
+                missing -= state.definitions.keys()
+            if missing:
+                fetch_definitions(ctx, missing, state.definitions)
+                if state.shared:
+                    # Visible to the other workers before the lock is released
+                    db.commit()
+    findings_errors_before = job.error_count
+
+    now = datetime.now()
+    rows = []
+    for vuln in vulnerabilities:
+        try:
+            vuln_id = vuln.get("id")
+            if not vuln_id:
+                continue
+            rows.append(vulnerability_row(local_asset.id, vuln, state.definitions.get(str(vuln_id)), now))
+        except Exception as e:
+            ctx.error(f"Error syncing vulnerability {vuln.get('id', 'unknown')}: {str(e)}")
+
+    # One batched INSERT ... ON CONFLICT instead of a lookup per vulnerability; only new
+    # or changed findings are written, the rest just get last_seen bumped in one UPDATE
+    job.vulns_upserted += crud.upsert_vulnerabilities(db, rows)
+    crud.touch_vulnerabilities(db, local_asset.id, [row["rapid7_vuln_id"] for row in rows], now)
+
+    # Close out findings InsightVM no longer reports once every finding is stored
+    if job.error_count == findings_errors_before:
+        job.vulns_resolved += crud.resolve_missing_vulnerabilities(db, local_asset.id, now)
+
+    # Advance the watermark only if definitions were complete too, so gaps are retried
+    if job.error_count == errors_before:
+        db.query(models.Asset).filter(models.Asset.id == local_asset.id).update({
+            "insightvm_last_scan_id": scan_id,
+            "insightvm_last_scan_date": scan_date,
+            "insightvm_synced_at": _utcnow()
+        }, synchronize_session=False)
+
+
+def sync_vulnerabilities(ctx: SyncJobContext):
+    """
+    Pull vulnerabilities for one asset (asset_ip) or every asset (sync_all) into the local database.
+    With incremental set, assets whose latest scan matches their stored watermark are skipped.
+    With sync_all and shards > 1 the assets are split across that many worker processes.
+    """
+    db = ctx.db
+    job = ctx.job
+    asset_ip = ctx.params.get("asset_ip")
+    incremental = ctx.params.get("incremental", False)
+
+    # First test the connection
+    connection_test = insightvm_client.test_connection()
+    if connection_test.get("status") != "connected":
+        raise SyncJobError(f"InsightVM connection failed: {connection_test.get('message', 'Unknown error')}")
+
+    if ctx.params.get("sync_all"):
+        if (ctx.params.get("shards") or 1) > 1:
+            return sync_vulnerabilities_sharded(ctx, ctx.params["shards"])
+        # Stream every asset from InsightVM, one page in memory at a time
+        assets = ctx.iter_assets("assets")
+    elif asset_ip:
+        # Search for specific asset by IP
+        search_response = insightvm_client.search_assets_by_ip(asset_ip)
+        if search_response.get("error"):
+            raise SyncJobError(f"Failed to search assets by IP: {search_response.get('error')}")
+        assets = ctx.iter_resources(search_response.get("resources", []))
+        job.assets_total = len(search_response.get("resources", []))
+    else:
+        raise SyncJobError("Either asset_ip or sync_all must be provided")
+
+    state = VulnerabilitySyncState(db, incremental, ip_addresses=None if ctx.params.get("sync_all") else [asset_ip])
+
+    for asset in assets:
+        try:
+            sync_asset_vulnerabilities(ctx, asset, state)
+        except Exception as e:
+            db.rollback()
+            ctx.error(f"Error syncing asset {asset.get('ip', 'unknown')}: {str(e)}")
+        finally:
+            job.assets_done += 1
+            ctx.checkpoint()
+
+    job.message = "Vulnerability sync completed"
+
+
+def shard_of(asset: Dict, shards: int) -> int:
+    """
+    Shard index of an InsightVM asset. Keyed on IP rather than the raw asset id because
+    local assets are matched by IP: assets sharing an IP always land in the same shard,
+    so two workers never race to create the same local asset.
+    """
+    return zlib.crc32(str(asset.get("ip") or asset.get("id")).encode()) % shards
+
+
+class ShardProgress:
+    """Counters one shard worker accumulates for a batch; the coordinator adds them to the job row"""
+
+    def __init__(self, requested_by: int):
+        self.requested_by = requested_by
+        for counter in SHARD_COUNTERS:
+            setattr(self, counter, 0)
+
+
+class ShardContext(SyncJobContext):
+    """SyncJobContext for a worker process: commits data only, progress goes back to the coordinator"""
+
+    def __init__(self, db: Session, job_id: int, requested_by: int):
+        self.db = db
+        self.job = ShardProgress(requested_by)
+        self.job_id = job_id
+        self.errors = []
+
+    def error(self, message: str):
+        logger.error(f"Sync job {self.job_id} shard worker: {message}")
+        self.job.error_count += 1
+        if len(self.errors) < MAX_STORED_ERRORS:
+            self.errors.append(message)
+
+    def checkpoint(self):
+        self.db.commit()
+
+    def result(self) -> Dict:
+        return {"counters": {counter: getattr(self.job, counter) for counter in SHARD_COUNTERS}, "errors": self.errors}
+
+
+# Per worker process state for the sharded sync, set up by _init_shard_worker
+_shard_state: Optional[VulnerabilitySyncState] = None
+
+
+def _init_shard_worker(base_url: str, incremental: bool, rate_limits: Dict, definitions_lock):
+    """
+    Process pool initializer. Each worker runs in a fresh (spawned) interpreter, so it has
+    its own InsightVM client session and database engine; only the console URL, its
+    share of the rate limit and the lock guarding definition fetches are handed over.
+    """
+    global _shard_state
+    insightvm_client.base_url = base_url
+    insightvm_client.rate_limiter = RateLimiter(**rate_limits)
+    db = SessionLocal()
+    try:
+        _shard_state = VulnerabilitySyncState(db, incremental, shared=True, definitions_lock=definitions_lock)
+    finally:
+        db.close()
+
+
+def sync_vulnerability_shard(job_id: int, requested_by: int, assets: List[Dict]) -> Dict:
+    """Sync one shard's assets of a page in a worker process and return its progress"""
+    db = SessionLocal(expire_on_commit=False)
+    ctx = ShardContext(db, job_id, requested_by)
+    try:
+        for asset in assets:
+            try:
+                sync_asset_vulnerabilities(ctx, asset, _shard_state)
+            except Exception as e:
+                db.rollback()
+                ctx.error(f"Error syncing asset {asset.get('ip', 'unknown')}: {str(e)}")
+            finally:
+                ctx.job.assets_done += 1
+                ctx.checkpoint()
+        return ctx.result()
+    finally:
+        db.close()
+
+
+def sync_vulnerabilities_sharded(ctx: SyncJobContext, shards: int):
+    """
+    Coordinator for a sharded sync_all: this thread walks the asset list and splits
+    each page across `shards` worker processes, then merges their counters and errors
+    into the job row. The resume cursor advances a whole page at a time.
+    """
+    job = ctx.job
+    # The shards draw from this process's rate limit budget instead of each getting a full one
+    mp_context = multiprocessing.get_context("spawn")
+    with insightvm_client.rate_limiter.shared_with(shards) as rate_limits:
+        pool = ProcessPoolExecutor(
+            max_workers=shards,
+            mp_context=mp_context,
+            initializer=_init_shard_worker,
+            initargs=(insightvm_client.base_url, ctx.params.get("incremental", False), rate_limits, mp_context.Lock())
+        )
+        try:
+            _sync_sharded_pages(ctx, pool, shards)
+        finally:
+            # Wait for running batches so no worker touches the shared state file after it is removed
+            pool.shutdown(wait=True, cancel_futures=True)
+
+    job.message = f"Vulnerability sync completed across {shards} worker processes"
+
+
+def _sync_sharded_pages(ctx: SyncJobContext, pool: ProcessPoolExecutor, shards: int):
+    """Split each page of the asset walk across the shard workers and merge their progress"""
+    job = ctx.job
+    for assets in ctx.iter_asset_pages("assets"):
+        batches = [[] for _ in range(shards)]
+        for asset in assets:
+            batches[shard_of(asset, shards)].append(asset)
+
+        futures = [pool.submit(sync_vulnerability_shard, job.id, job.requested_by, batch) for batch in batches if batch]
+        # Keep the job visibly alive while the shards work through the page; results are
+        # merged only once the page is done, so these commits carry no partial progress
+        while wait(futures, timeout=SHARD_HEARTBEAT_INTERVAL).not_done:
+            ctx.heartbeat()
+            ctx.db.commit()
+        for future in futures:
+            try:
+                ctx.merge(future.result())
+            except BrokenProcessPool:
+                # The page is redone when the job is resumed from its last checkpoint
+                raise SyncJobError("A shard worker process died; resume the job to continue")
+            except Exception as e:
+                ctx.error(f"Shard worker failed: {e}")
+        ctx.checkpoint()
+
+
+def sync_assets(ctx: SyncJobContext):
+    """Pull assets for one site (site_id) or the whole console (sync_all) into the local database"""
+    db = ctx.db
+    job = ctx.job
+    site_id = ctx.params.get("site_id")
+
+    if ctx.params.get("sync_all"):
+        # Stream every asset from InsightVM, one page in memory at a time
+        assets = ctx.iter_assets("assets")
+    elif site_id:
+        # Stream assets for specific site
+        assets = ctx.iter_assets(f"sites/{site_id}/assets")
+    else:
+        raise SyncJobError("Either site_id or sync_all must be provided")
+
+    # Get default team for unassigned assets
+    default_team = db.query(models.Team).first()
+    if not default_team:
+        raise SyncJobError("No default team found")
+    default_team_id = default_team.id
+
+    # Match incoming assets to local ones from memory instead of a query per asset
+    lookup = AssetLookup.load(db)
+
+    for asset in assets:
+        try:
+            asset_ip = asset.get("ip")
+            if not asset_ip:
+                continue
+
+            # Check if asset already exists
+            existing_asset = lookup.get(asset_ip)
+
+            if not existing_asset:
+                # Create new asset
+                new_asset = models.Asset(
+                    name=asset.get("hostName", f"Asset_{asset_ip}"),
+                    ip_address=asset_ip,
+                    os_version=asset.get("os", "Unknown"),
+                    public_facing=False,  # Default to false, can be updated manually
+                    team_id=default_team_id,
+                    owner_id=job.requested_by
+                )
+                db.add(new_asset)
+                db.flush()
+                new_asset_id = new_asset.id
+                db.commit()
+                lookup.add(asset_ip, new_asset_id, default_team_id)
+            else:
+                # Update existing asset; fields InsightVM did not report are left as they are
+                values = {"updated_at": datetime.now()}
+                if "hostName" in asset:
+                    values["name"] = asset["hostName"]
+                if "os" in asset:
+                    values["os_version"] = asset["os"]
+                db.query(models.Asset).filter(models.Asset.id == existing_asset.id).update(
+                    values, synchronize_session=False
+                )
+            job.assets_upserted += 1
+
+        except Exception as e:
+            db.rollback()
+            ctx.error(f"Error syncing asset {asset.get('ip', 'unknown')}: {str(e)}")
+        finally:
+            job.assets_done += 1
+            ctx.checkpoint()
+
+    job.message = "Asset sync completed"
+
+
+def archive_vulnerabilities(ctx: SyncJobContext):
+    """Move vulnerabilities resolved more than older_than_days ago into vulnerability_history"""
+    older_than_days = ctx.params.get("older_than_days")
+    if older_than_days is None:
+        older_than_days = settings.insightvm_resolved_retention_days
+    resolved_before = datetime.now() - timedelta(days=older_than_days)
+
+    # Batches keep each transaction short on large tables
+    while True:
+        archived = crud.archive_resolved_vulnerabilities(ctx.db, resolved_before)
+        ctx.job.vulns_archived += archived
+        ctx.checkpoint()
+        if not archived:
+            break
+
+    ctx.job.message = f"Archived {ctx.job.vulns_archived} vulnerabilities resolved before {resolved_before:%Y-%m-%d}"
+
+
+SYNC_HANDLERS = {
+    "vulnerabilities": sync_vulnerabilities,
+    "assets": sync_assets,
+    "retention": archive_vulnerabilities
+}
+
+
+class SyncJobRunner:
+    """
+    Runs InsightVM sync jobs on a per-process worker pool.
+    Job state lives on models.SyncJob rows, so any process can report on jobs
+    and a restarted process can see what ran and what was interrupted.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or settings.insightvm_sync_workers
+        # host:pid:boot; the boot token tells this run apart from an earlier one that had the
+        # same pid, e.g. a restarted container where the app is always PID 1
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+        self._executor = None
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="insightvm-sync")
+            return self._executor
+
+    def submit(self, db: Session, job_type: str, params: Dict, user_id: int) -> models.SyncJob:
+        """Persist a pending job and queue it on the worker pool"""
+        if job_type not in SYNC_HANDLERS:
+            raise ValueError(f"Unknown sync job type: {job_type}")
+        job = crud.create_sync_job(db, job_type, params, user_id, worker=self.worker_id)
+        self._get_executor().submit(self._run, job.id)
+        return job
+
+    def _run(self, job_id: int):
+        # The job row is only written by this worker, so it need not be reloaded after every checkpoint
+        db = SessionLocal(expire_on_commit=False)
+        try:
+            # Claim the job only if it is still queued for this worker; a job recovered as
+            # interrupted (and possibly resumed elsewhere) while queued is left alone
+            now = _utcnow()
+            claimed = db.query(models.SyncJob).filter(
+                models.SyncJob.id == job_id,
+                models.SyncJob.status == "pending",
+                models.SyncJob.worker == self.worker_id
+            ).update({
+                "status": "running",
+                "heartbeat_at": now,
+                # A resumed job keeps the start time of its first run
+                "started_at": func.coalesce(models.SyncJob.started_at, now)
+            }, synchronize_session=False)
+            db.commit()
+            if not claimed:
+                logger.warning(f"Sync job {job_id} is no longer queued for worker {self.worker_id}; not running it")
+                return
+            job = crud.get_sync_job(db, job_id)
+
+            ctx = SyncJobContext(db, job, self._stop_event)
+            try:
+                SYNC_HANDLERS[job.job_type](ctx)
+                job.status = "completed"
+                job.resume_cursor = None
+            except SyncJobLost as e:
+                logger.warning(str(e))
+                return
+            except SyncJobInterrupted as e:
+                job.status = "interrupted"
+                job.message = str(e)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Sync job {job_id} failed: {e}")
+                job.status = "failed"
+                job.message = str(e)
+
+            job.errors = json.dumps(ctx.errors)
+            try:
+                ctx.heartbeat()
+            except SyncJobLost as e:
+                logger.warning(str(e))
+                return
+            job.finished_at = job.heartbeat_at = _utcnow()
+            db.commit()
+        except Exception as e:
+            logger.error(f"Could not record state for sync job {job_id}: {e}")
+        finally:
+            db.close()
+
+    def resume(self, db: Session, job_id: int) -> Optional[models.SyncJob]:
+        """
+        Requeue an interrupted or failed job. It keeps its counters and continues from
+        its resume cursor, so only the unfinished part is synced again. Returns None
+        if the job does not exist; raises ValueError if it is not resumable.
+        """
+        # Claim with a conditional UPDATE so two processes cannot resume the same job
+        claimed = db.query(models.SyncJob).filter(
+            models.SyncJob.id == job_id,
+            models.SyncJob.status.in_(RESUMABLE_STATUSES)
+        ).update({
+            "status": "pending",
+            "worker": self.worker_id,
+            "message": None,
+            "finished_at": None,
+            "heartbeat_at": _utcnow(),
+            "resume_count": models.SyncJob.resume_count + 1
+        }, synchronize_session=False)
+        db.commit()
+
+        job = crud.get_sync_job(db, job_id)
+        if job is None:
+            return None
+        if not claimed:
+            raise ValueError(f"Sync job {job_id} is {job.status} and cannot be resumed")
+        self._get_executor().submit(self._run, job.id)
+        return job
+
+    def recover_interrupted(self) -> int:
+        """
+        Mark active jobs whose worker is gone as interrupted. Jobs owned by a process on
+        this host are judged by whether that process still exists; jobs owned elsewhere
+        by their heartbeat. A queued job owned elsewhere is only written off once it is
+        stale, since it has no heartbeat until a worker thread picks it up.
+        """
+        db = SessionLocal()
+        try:
+            host = socket.gethostname()
+            stale_before = _utcnow() - timedelta(seconds=settings.insightvm_sync_job_stale_after)
+            recovered = 0
+            for job in db.query(models.SyncJob).filter(models.SyncJob.status.in_(ACTIVE_STATUSES)).all():
+                alive = self._worker_is_alive(job.worker, host)
+                if alive is None:
+                    last_seen = _as_utc(job.heartbeat_at or job.created_at)
+                    alive = last_seen is None or last_seen >= stale_before
+                if alive:
+                    continue
+                # Conditional so a job that moved on since it was read is not overwritten
+                recovered += db.query(models.SyncJob).filter(
+                    models.SyncJob.id == job.id,
+                    models.SyncJob.status == job.status,
+                    models.SyncJob.worker == job.worker
+                ).update({
+                    "status": "interrupted",
+                    "message": f"Worker {job.worker} stopped before the job finished",
+                    "finished_at": _utcnow()
+                }, synchronize_session=False)
+            db.commit()
+            if recovered:
+                logger.warning(f"Marked {recovered} sync job(s) as interrupted")
+
+            if settings.insightvm_sync_auto_resume:
+                interrupted = db.query(models.SyncJob.id).filter(models.SyncJob.status == "interrupted").all()
+                for (job_id,) in interrupted:
+                    try:
+                        self.resume(db, job_id)
+                        logger.info(f"Resumed interrupted sync job {job_id}")
+                    except ValueError:
+                        # Another process resumed it first
+                        pass
+            return recovered
+        finally:
+            db.close()
+
+    def _worker_is_alive(self, worker: Optional[str], host: str) -> Optional[bool]:
+        """
+        Whether `worker` (host:pid:boot, or host:pid from older rows) is a running process,
+        or None if that cannot be told from here because it is on another host.
+        """
+        if worker == self.worker_id:
+            return True
+        worker_host, _, pid = (worker or "").rpartition(":")
+        if not pid.isdigit():
+            worker_host, _, pid = worker_host.rpartition(":")
+        if worker_host != host or not pid.isdigit():
+            return None
+        if int(pid) == os.getpid():
+            # Our pid but not our id: left behind by an earlier run of this process
+            return False
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            # Exists but belongs to another user
+            return True
+        return True
+
+    def shutdown(self):
+        """
+        Stop accepting work. Running jobs stop at their next checkpoint and are
+        marked interrupted; queued jobs stay pending and are recovered on next start.
+        """
+        self._stop_event.set()
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Create global instance
+sync_job_runner = SyncJobRunner()
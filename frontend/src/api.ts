@@ -395,22 +395,36 @@ export const insightVMAPI = {
     return response.data;
   },
 
+  // Sync endpoints queue a background job and return it; poll getSyncJob for progress
   syncVulnerabilities: async (assetIp?: string, syncAll: boolean = false): Promise<any> => {
-    const response = await api.post('/insightvm/sync/vulnerabilities', {
-      asset_ip: assetIp,
-      sync_all: syncAll
+    const response = await api.post('/insightvm/sync/vulnerabilities', null, {
+      params: { asset_ip: assetIp, sync_all: syncAll }
     });
     return response.data;
   },
 
   syncAssets: async (siteId?: number, syncAll: boolean = false): Promise<any> => {
-    const response = await api.post('/insightvm/sync/assets', {
-      site_id: siteId,
-      sync_all: syncAll
+    const response = await api.post('/insightvm/sync/assets', null, {
+      params: { site_id: siteId, sync_all: syncAll }
     });
     return response.data;
   },
 
+  getSyncJob: async (jobId: number): Promise<any> => {
+    const response = await api.get(`/insightvm/sync/jobs/${jobId}`);
+    return response.data;
+  },
+
+  resumeSyncJob: async (jobId: number): Promise<any> => {
+    const response = await api.post(`/insightvm/sync/jobs/${jobId}/resume`);
+    return response.data;
+  },
+
+  getSyncJobs: async (): Promise<any[]> => {
+    const response = await api.get('/insightvm/sync/jobs');
+    return response.data;
+  },
+
   getAssetVulnerabilities: async (assetId: number): Promise<any> => {
     const response = await api.get(`/insightvm/assets/${assetId}/vulnerabilities`);
     return response.data;
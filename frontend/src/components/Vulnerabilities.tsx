@@ -156,8 +156,12 @@ const Vulnerabilities: React.FC = () => {
     return exploitableVulns.length;
   };
 
+  const getOpenVulnerabilities = () => {
+    return vulnerabilities.filter(v => v.status === 'open');
+  };
+
   const getCriticalHighCount = () => {
-    return vulnerabilities.filter(v => 
+    return getOpenVulnerabilities().filter(v => 
       v.severity.toLowerCase() === 'critical' || v.severity.toLowerCase() === 'high'
     ).length;
   };
@@ -173,7 +177,7 @@ const Vulnerabilities: React.FC = () => {
       const result = await insightVMAPI.syncVulnerabilities(undefined, syncAll);
       setAlert({ 
         type: 'success', 
-        message: `Successfully synced ${result.synced_count} vulnerabilities from InsightVM` 
+        message: `InsightVM vulnerability sync started (job #${result.id}); results appear as the job progresses` 
       });
       fetchVulnerabilities(); // Refresh data
     } catch (error) {
@@ -231,7 +235,7 @@ const Vulnerabilities: React.FC = () => {
           <CardContent sx={{ textAlign: 'center' }}>
             <Security sx={{ fontSize: 40, color: 'primary.main', mb: 1 }} />
             <Typography variant="h4" color="primary">
-              {vulnerabilities.length}
+              {getOpenVulnerabilities().length}
             </Typography>
             <Typography variant="body2" color="textSecondary">
               Total Vulnerabilities
@@ -264,7 +268,7 @@ const Vulnerabilities: React.FC = () => {
           <CardContent sx={{ textAlign: 'center' }}>
             <CheckCircle sx={{ fontSize: 40, color: 'success.main', mb: 1 }} />
             <Typography variant="h4" color="success.main">
-              {vulnerabilities.filter(v => v.status === 'closed').length}
+              {vulnerabilities.filter(v => v.status === 'resolved').length}
             </Typography>
             <Typography variant="body2" color="textSecondary">
               Resolved
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test sync job recovery after a restart, against a throwaway SQLite database
+"""
+
+import os
+import socket
+import sys
+import tempfile
+
+# Use a scratch database; must be set before the backend modules are imported
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'sync_jobs_test.db')}"
+
+# Add the backend directory to the path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'backend'))
+
+import models
+from config import settings
+from database import SessionLocal, engine
+from sync_jobs import SyncJobRunner
+
+models.Base.metadata.create_all(bind=engine)
+
+
+def _add_job(db, status: str, worker: str) -> int:
+    job = models.SyncJob(job_type="assets", status=status, params="{}", requested_by=1, worker=worker)
+    db.add(job)
+    db.commit()
+    return job.id
+
+
+def test_recover_jobs_left_by_restarted_process():
+    """A restart reuses host and pid (the app runs as PID 1 in its container); the old run's jobs must be recovered"""
+    settings.insightvm_sync_auto_resume = False
+    host = socket.gethostname()
+    previous_run = SyncJobRunner()
+    runner = SyncJobRunner()
+    assert previous_run.worker_id != runner.worker_id
+
+    db = SessionLocal()
+    try:
+        left_running = _add_job(db, "running", previous_run.worker_id)
+        left_pending = _add_job(db, "pending", previous_run.worker_id)
+        legacy_id = _add_job(db, "running", f"{host}:{os.getpid()}")
+        own_job = _add_job(db, "pending", runner.worker_id)
+
+        assert runner.recover_interrupted() == 3
+
+        db.expire_all()
+        for job_id in (left_running, left_pending, legacy_id):
+            assert db.get(models.SyncJob, job_id).status == "interrupted"
+        assert db.get(models.SyncJob, own_job).status == "pending"
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    test_recover_jobs_left_by_restarted_process()
+    print("✅ Sync job restart recovery test passed!")